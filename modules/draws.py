@@ -0,0 +1,113 @@
+# modules/draws.py
+"""
+Anàlisi exacta de projectes (draws): enumera les cartes de turn/river que
+milloren la mà de l'heroi amb l'avaluador ràpid.
+
+Una carta és out si puja la categoria de l'heroi i, a més, augmenta el seu
+avantatge sobre el que dona el board sol (una carta que dobla el board no
+converteix AK en "dobles parelles" útils). Al flop també es calcula la
+probabilitat de millorar fins al river enumerant totes les parelles
+turn+river (inclou runner-runner).
+
+El resultat es memoritza per (hero, board): tech_eval i la UI comparteixen
+la mateixa anàlisi.
+"""
+from __future__ import annotations
+import itertools
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+from .evaluator import (
+    CATEGORY_NAMES, FLUSH, STRAIGHT, STRAIGHT_FLUSH, card_mask, category_of, encode_many, hand_value,
+)
+
+class DrawAnalysis(NamedTuple):
+    category: str                               # categoria actual ('' sense board)
+    outs: int                                   # cartes que milloren a la propera carta
+    outs_by_category: Tuple[Tuple[str, int], ...]  # (categoria resultant, outs)
+    p_next: float                               # P(millorar a la propera carta)
+    p_river: float                              # P(millorar abans del river)
+    labels: Tuple[str, ...]                     # 'Flush draw', 'OESD', ... (UI)
+
+    def outs_dict(self) -> Dict[str, int]:
+        return dict(self.outs_by_category)
+
+_EMPTY = DrawAnalysis("", 0, (), 0.0, 0.0, ())
+
+def _cat(cards: List[int]) -> int:
+    return category_of(hand_value(cards))
+
+def _improves(cat_old: int, lead_old: int, hero_board: List[int], board: List[int]) -> int:
+    """Nova categoria si la mà millora de veritat; -1 si no."""
+    cat_new = _cat(hero_board)
+    if cat_new > cat_old and cat_new - _cat(board) > lead_old:
+        return cat_new
+    return -1
+
+@lru_cache(maxsize=4096)
+def _analyze(hero: Tuple[int, ...], board: Tuple[int, ...]) -> DrawAnalysis:
+    hb = list(hero) + list(board)
+    cat_old = _cat(hb)
+    if len(board) >= 5:
+        return _EMPTY._replace(category=CATEGORY_NAMES[cat_old], labels=_labels(hero, board, cat_old, set()))
+    lead_old = cat_old - _cat(list(board))
+    dead = card_mask(hb)
+    deck = [c for c in range(52) if not (dead >> c) & 1]
+
+    by_cat: Dict[int, int] = {}
+    out_ranks = set()
+    for c in deck:
+        cat = _improves(cat_old, lead_old, hb + [c], list(board) + [c])
+        if cat >= 0:
+            by_cat[cat] = by_cat.get(cat, 0) + 1
+            if cat in (STRAIGHT, STRAIGHT_FLUSH):
+                out_ranks.add(c >> 2)
+    outs = sum(by_cat.values())
+    p_next = outs / len(deck)
+
+    if len(board) == 3:
+        hits = 0
+        pairs = 0
+        for t, r in itertools.combinations(deck, 2):
+            pairs += 1
+            if _improves(cat_old, lead_old, hb + [t, r], list(board) + [t, r]) >= 0:
+                hits += 1
+        p_river = hits / pairs
+    else:
+        p_river = p_next
+
+    return DrawAnalysis(
+        CATEGORY_NAMES[cat_old],
+        outs,
+        tuple((CATEGORY_NAMES[k], n) for k, n in sorted(by_cat.items(), reverse=True)),
+        p_next,
+        p_river,
+        _labels(hero, board, cat_old, out_ranks),
+    )
+
+def _labels(hero: Tuple[int, ...], board: Tuple[int, ...], cat_old: int, out_ranks: set) -> Tuple[str, ...]:
+    txt = []
+    suits = [c & 3 for c in hero + board]
+    counts = [suits.count(s) for s in range(4)]
+    if cat_old >= FLUSH and max(counts) >= 5:
+        txt.append("Color fet")
+    elif len(board) < 5 and any(counts[h & 3] == 4 for h in hero):
+        txt.append("Flush draw")
+    if cat_old < STRAIGHT:
+        if len(out_ranks) >= 2:
+            txt.append("OESD")
+        elif out_ranks:
+            txt.append("Gutshot")
+    top = max(c >> 2 for c in board)
+    if all(h >> 2 > top for h in hero):
+        txt.append("Overcards")
+    return tuple(txt)
+
+def analyze_draws(hero: List[str], board: List[str]) -> DrawAnalysis:
+    """
+    Outs i probabilitats de millora de l'heroi (memoritzat per hero/board).
+    Preflop o amb mà incompleta retorna una anàlisi buida.
+    """
+    if len(hero) < 2 or len(board) < 3:
+        return _EMPTY
+    return _analyze(tuple(sorted(encode_many(hero))), tuple(sorted(encode_many(board))))
@@ -3,11 +3,15 @@
 from __future__ import annotations
 import random
 import itertools
-from typing import List, Tuple, Dict, Optional
+import math
+import time
+from typing import Callable, Iterator, List, NamedTuple, Tuple, Dict, Optional
 
-RANKS = "23456789TJQKA"
-SUITS = "cdhs"  # clubs, diamonds, hearts, spades
-ALL_CARDS = [r + s for r in RANKS for s in SUITS]
+from .rangeparse import RangeSyntaxError, range_combos
+from .evaluator import (
+    RANKS, SUITS, ALL_CARDS, CARD_CODE, RANK_KEY_MASK, RANK_VALUE, SUIT_SHIFT,
+    card_mask, encode_many, hand_value, value_from_code, hand_values_np, np,
+)
 
 # ---------- Utilitats bàsiques ----------
 
@@ -19,7 +23,7 @@ def deck_without(excluded: List[str]) -> List[str]:
     excl = set(excluded)
     return [c for c in ALL_CARDS if c not in excl]
 
-# ---------- Avaluador senzill (fallback) ----------
+# ---------- Avaluador de referència (strings, lent) ----------
 HAND_RANK_ORDER = {
     "high": 0,
     "pair": 1,
@@ -80,9 +84,9 @@ def best5_from7(cards7: List[str]) -> Tuple[int, List[int]]:
         kick = max(rv for rv in uniq_ranks if rv != quad)
         return (HAND_RANK_ORDER["quads"], [quad, kick])
 
-    if counts[0][0] == 3 and any(c == 2 for c, _ in counts[1:]):
+    if counts[0][0] == 3 and any(c >= 2 for c, _ in counts[1:]):
         trips = counts[0][1]
-        pair = max(rv for cnt, rv in counts if cnt == 2)
+        pair = max(rv for cnt, rv in counts[1:] if cnt >= 2)
         return (HAND_RANK_ORDER["full_house"], [trips, pair])
 
     if flush_suit:
@@ -111,7 +115,8 @@ def best5_from7(cards7: List[str]) -> Tuple[int, List[int]]:
     top5 = sorted(uniq_ranks, reverse=True)[:5]
     return (HAND_RANK_ORDER["high"], top5)
 
-def compare7(a7: List[str], b7: List[str]) -> int:
+def compare7_ref(a7: List[str], b7: List[str]) -> int:
+    """Comparació amb l'avaluador de referència (oracle per validar l'avaluador ràpid)."""
     ca = best5_from7(a7)
     cb = best5_from7(b7)
     if ca[0] != cb[0]:
@@ -121,72 +126,612 @@ def compare7(a7: List[str], b7: List[str]) -> int:
             return 1 if x > y else -1
     return 0
 
-# ---------- Equity Monte Carlo ----------
-def estimate_equity(hero_hole: List[str], board: List[str], villain_range: List[List[str]], trials: int = 20000) -> float:
-    """Equity de l'heroi contra 1 vilà amb rang de combos."""
-    used = set(hero_hole + board)
-    combos = [c for c in villain_range if not (set(c) & used)]
+def compare7(a7: List[str], b7: List[str]) -> int:
+    va = hand_value(encode_many(a7))
+    vb = hand_value(encode_many(b7))
+    return (va > vb) - (va < vb)
+
+# ---------- Equity exacta (enumeració) ----------
+# Nombre màxim de showdowns (combos x runouts) per enumerar en lloc de simular.
+# ~0.4µs per showdown: cobreix turn/river sempre i el flop contra rangs típics.
+EXACT_BUDGET = 250000
+# Showdowns enumerables per ms (conservador): amb pressupost de temps, només
+# s'enumera si hi cap; si no, Monte Carlo per lots.
+EXACT_PER_MS = 1000
+
+def _comb(n: int, k: int) -> int:
+    return math.comb(n, k) if 0 <= k <= n else 0
+
+def exact_work(n_board: int, n_combos: int, deck_size: int) -> int:
+    """Showdowns necessaris per enumerar tots els runouts contra tots els combos."""
+    need = 5 - n_board
+    if n_combos == 0:  # rival random: tots els parells del deck
+        n_combos = _comb(deck_size, 2)
+    return n_combos * _comb(deck_size - 2, need)
+
+def exact_equity(hero_hole: List[str], board: List[str], villain_range: List[List[str]]) -> float:
+    """Equity exacta enumerant tots els runouts contra tots els combos no bloquejats."""
+    hero_i, board_i, combos, deck, sampler = _prepare(hero_hole, board, villain_range)
+    wins, ties, total = _exact_counts(hero_i, board_i, combos, deck, _weights(sampler))
+    return (wins + 0.5 * ties) / max(1, total)
+
+def _exact_counts(hero_i: List[int], board_i: List[int], combos: List[Tuple[int, int, int]],
+                  deck: List[int], weights: Optional[List[float]] = None,
+                  runouts=None, hs: Optional[list] = None) -> Tuple[float, float, float]:
+    """
+    Retorna (wins, ties, showdowns) enumerant combos x runouts. Amb weights,
+    cada showdown compta el pes del combo del vilà. runouts: iterable de
+    runouts a recórrer (per defecte, tots). Si es passa la llista hs, s'hi
+    afegeix (score, showdowns) de cada runout per a la distribució d'equity.
+    """
+    need = 5 - len(board_i)
     if not combos:
-        combos = []
+        combos = [(a, b, CARD_CODE[a] + CARD_CODE[b]) for a, b in itertools.combinations(deck, 2)]
+        weights = None
+    hero_board = hero_i + board_i
+    hero_k = sum(CARD_CODE[c] for c in hero_board)
+    board_k = sum(CARD_CODE[c] for c in board_i)
+    code = CARD_CODE
+    value = value_from_code
+    table = RANK_VALUE
+    if weights is None:
+        weights = [1] * len(combos)
+    entries = [((1 << v1) | (1 << v2), board_k + vk, [v1, v2], w) for (v1, v2, vk), w in zip(combos, weights)]
+    wins = ties = total = 0
+    if runouts is None:
+        runouts = itertools.combinations(deck, need)
+    for run in runouts:
+        run_mask = 0
+        rk = 0
+        for c in run:
+            run_mask |= 1 << c
+            rk += code[c]
+        run_l = list(run)
+        hv = value(hero_k + rk, hero_board + run_l)
+        rw = rt = rn = 0
+        for vmask, vbase, vcards, w in entries:
+            if vmask & run_mask:
+                continue
+            vk = vbase + rk
+            if ((vk >> SUIT_SHIFT) + 0x3333) & 0x8888:
+                vv = value(vk, board_i + run_l + vcards)
+            else:
+                vv = table.get(vk & RANK_KEY_MASK) or value(vk, ())
+            if hv > vv:
+                rw += w
+            elif hv == vv:
+                rt += w
+            rn += w
+        wins += rw
+        ties += rt
+        total += rn
+        if hs is not None and rn:
+            hs.append((rw + 0.5 * rt, rn))
+    return wins, ties, total
+
+# ---------- Equity Monte Carlo ----------
+def estimate_equity(hero_hole: List[str], board: List[str], villain_range: List[List[str]], trials: int = 20000,
+                    exact_budget: Optional[int] = EXACT_BUDGET) -> float:
+    """
+    Equity de l'heroi contra 1 vilà amb rang de combos.
+    Si enumerar tots els runouts cap dins d'exact_budget showdowns (turn/river),
+    el resultat és exacte i determinista; si no, Monte Carlo amb `trials`.
+    Amb un rang compilat amb pesos (ranges.CompiledRange), els combos es
+    sortegen proporcionalment al pes.
+    """
+    hero_i, board_i, combos, deck, sampler = _prepare(hero_hole, board, villain_range)
+    if exact_budget and exact_work(len(board_i), len(combos), len(deck)) <= exact_budget:
+        wins, ties, total = _exact_counts(hero_i, board_i, combos, deck, _weights(sampler))
+        return (wins + 0.5 * ties) / max(1, total)
+    wins, ties = _mc_counts(hero_i, board_i, combos, deck, trials, random, sampler)
+    return (wins + 0.5 * ties) / max(1, trials)
+
+def _combo_entry(combo: List[str]) -> Tuple[int, int, int]:
+    a, b = encode_many(combo)
+    return a, b, CARD_CODE[a] + CARD_CODE[b]
+
+def _live_entries(villain_range, dead_mask: int) -> List[Tuple[int, int, int]]:
+    """
+    Combos no bloquejats com (c1, c2, suma de codes). Accepta llistes de
+    combos en strings o rangs compilats (ranges.CompiledRange), que filtren
+    amb una sola operació de màscara.
+    """
+    if hasattr(villain_range, "live_entries"):
+        return villain_range.live_entries(dead_mask)
+    out = []
+    for c in villain_range:
+        e = _combo_entry(c)
+        if not ((dead_mask >> e[0]) & 1 or (dead_mask >> e[1]) & 1):
+            out.append(e)
+    return out
+
+def _live_sampler(villain_range, dead_mask: int):
+    """
+    Sorteig ponderat (sampling.AliasSampler) alineat amb _live_entries, o
+    None si el rang és uniforme i n'hi ha prou amb un índex aleatori.
+    """
+    if hasattr(villain_range, "live_sampler"):
+        return villain_range.live_sampler(dead_mask)
+    return None
+
+def _weights(sampler) -> Optional[List[float]]:
+    return sampler.weights if sampler is not None else None
+
+def _prepare(hero_hole: List[str], board: List[str], villain_range: List[List[str]]):
+    """
+    Codifica l'spot: (hero_i, board_i, combos no bloquejats, deck restant,
+    sampler dels combos o None si són equiprobables).
+    """
+    hero_i = encode_many(hero_hole)
+    board_i = encode_many(board)
+    dead = card_mask(hero_i + board_i)
+    combos = _live_entries(villain_range, dead)
+    sampler = _live_sampler(villain_range, dead) if combos else None
+    deck = [ci for ci in range(52) if not (dead >> ci) & 1]
+    return hero_i, board_i, combos, deck, sampler
+
+def _mc_counts(hero_i: List[int], board_i: List[int], combos: List[Tuple[int, int, int]],
+               deck: List[int], trials: int, rng, sampler=None) -> Tuple[int, int]:
+    """
+    Nucli Monte Carlo amb cartes enteres. combos: (c1, c2, suma de codes) ja
+    filtrats de bloquejos. rng: objecte amb .random() i .choice() (p.ex. el
+    mòdul random). Amb sampler (AliasSampler), els combos es sortegen amb els
+    seus pesos. Retorna (wins, ties).
+    """
+    need = 5 - len(board_i)
+    hero_board = hero_i + board_i
+    hero_k = sum(CARD_CODE[c] for c in hero_board)
+    board_k = sum(CARD_CODE[c] for c in board_i)
+    code = CARD_CODE
+    table = RANK_VALUE
+    value = value_from_code
+    rand = rng.random
+    choice = rng.choice
+    draw = sampler.draw if sampler is not None else None
+    n = len(deck)
     wins = ties = 0
     for _ in range(trials):
-        deck = deck_without(hero_hole + board)
-        if combos:
-            v = random.choice(combos)
-            for x in v:
-                deck.remove(x)
+        if draw is not None:
+            v1, v2, vk = combos[draw(rand)]
+        elif combos:
+            v1, v2, vk = choice(combos)
         else:
-            v = random.sample(deck, 2)
-            for x in v:
-                deck.remove(x)
-        need = 5 - len(board)
-        runout = random.sample(deck, need)
-        a7 = hero_hole + board + runout
-        b7 = v + board + runout
-        cmp_ = compare7(a7, b7)
-        if cmp_ > 0:
+            v1 = deck[int(rand() * n)]
+            v2 = v1
+            while v2 == v1:
+                v2 = deck[int(rand() * n)]
+            vk = code[v1] + code[v2]
+        # runout per rebuig: col·lisions rares amb <=7 cartes d'un deck de ~45
+        taken = (1 << v1) | (1 << v2)
+        run = []
+        rk = 0
+        while len(run) < need:
+            c = deck[int(rand() * n)]
+            if not (taken >> c) & 1:
+                taken |= 1 << c
+                run.append(c)
+                rk += code[c]
+        hk = hero_k + rk
+        vk += board_k + rk
+        if ((hk >> SUIT_SHIFT) + 0x3333) & 0x8888:
+            hv = value(hk, hero_board + run)
+        else:
+            hv = table.get(hk & RANK_KEY_MASK) or value(hk, ())
+        if ((vk >> SUIT_SHIFT) + 0x3333) & 0x8888:
+            vv = value(vk, board_i + run + [v1, v2])
+        else:
+            vv = table.get(vk & RANK_KEY_MASK) or value(vk, ())
+        if hv > vv:
             wins += 1
-        elif cmp_ == 0:
+        elif hv == vv:
             ties += 1
+    return wins, ties
+
+# ---------- Equity Monte Carlo per lots (numpy) ----------
+def estimate_equity_batch(hero_hole: List[str], board: List[str], villain_range: List[List[str]],
+                          trials: int = 20000, batch_size: int = 4096, seed: Optional[int] = None,
+                          exact_budget: Optional[int] = EXACT_BUDGET) -> float:
+    """
+    Mateixa interfície que estimate_equity, però sorteja combos i runouts en
+    lots d'enters i puntua cada lot de mans de 7 cartes d'un sol cop.
+    Sense numpy, amb una mà que no és de 7 cartes (heroi incomplet mentre
+    s'escriu) o si l'enumeració exacta cap a exact_budget, delega a
+    estimate_equity.
+    """
+    hero_i, board_i, combos, deck, sampler = _prepare(hero_hole, board, villain_range)
+    if not _batch_ok(hero_i, board_i) or (exact_budget and exact_work(len(board_i), len(combos), len(deck)) <= exact_budget):
+        return estimate_equity(hero_hole, board, villain_range, trials=trials, exact_budget=exact_budget)
+    rng = np.random.default_rng(seed)
+    wins, ties = _batch_counts(*_np_spot(hero_i, board_i, combos, deck, sampler), trials, batch_size, rng)
     return (wins + 0.5 * ties) / max(1, trials)
 
+def _batch_ok(hero_i: List[int], board_i: List[int]) -> bool:
+    """El nucli numpy només puntua mans de 7 cartes: heroi de 2 i board de 0 a 5."""
+    return np is not None and len(hero_i) == 2 and len(hero_i) + len(board_i) <= 7
+
+def _np_spot(hero_i, board_i, combos, deck, sampler=None):
+    """Arrays (hero+board, board, combos Nx2, deck) i sampler per a _batch_counts."""
+    return (np.array(hero_i + board_i, dtype=np.int64),
+            np.array(board_i, dtype=np.int64),
+            np.array([(a, b) for a, b, _ in combos], dtype=np.int64).reshape(-1, 2),
+            np.array(deck, dtype=np.int64),
+            sampler)
+
+def _batch_counts(hero_board, board, combos, deck, sampler, trials: int, batch_size: int, rng) -> Tuple[int, int]:
+    """Nucli vectoritzat: retorna (wins, ties) sobre `trials` runouts."""
+    need = 5 - len(board)
+    wins = ties = 0
+    done = 0
+    while done < trials:
+        n = min(batch_size, trials - done)
+        # permutació aleatòria per fila; ens quedem les need+2 primeres cartes
+        perm = np.argsort(rng.random((n, deck.size)), axis=1)[:, :need + 2]
+        drawn = deck[perm]
+        if len(combos):
+            if sampler is None:
+                v = combos[rng.integers(len(combos), size=n)]
+            else:
+                v = combos[sampler.draw_np(rng, n)]
+            ok = (drawn != v[:, :1]) & (drawn != v[:, 1:2])
+            pick = np.argsort(~ok, axis=1, kind="stable")[:, :need]
+            run = np.take_along_axis(drawn, pick, axis=1)
+        else:
+            v = drawn[:, :2]
+            run = drawn[:, 2:]
+        hv = hand_values_np(np.hstack([np.broadcast_to(hero_board, (n, hero_board.size)), run]))
+        vv = hand_values_np(np.hstack([np.broadcast_to(board, (n, board.size)), v, run]))
+        wins += int((hv > vv).sum())
+        ties += int((hv == vv).sum())
+        done += n
+    return wins, ties
+
+# ---------- Monte Carlo adaptatiu (convergència) ----------
+class EquityEstimate(NamedTuple):
+    equity: float
+    ci_low: float
+    ci_high: float
+    trials: int
+    exact: bool = False
+
+    @property
+    def se(self) -> float:
+        """Error estàndard implícit en l'interval (z=1.96)."""
+        return (self.ci_high - self.ci_low) / (2 * 1.96)
+
+def merge_estimates(a: EquityEstimate, b: EquityEstimate, z: float = 1.96) -> EquityEstimate:
+    """Combina dues estimacions Monte Carlo independents del mateix spot (pes = trials)."""
+    if a.exact or not b.trials:
+        return a
+    if b.exact or not a.trials:
+        return b
+    n = a.trials + b.trials
+    mean = (a.equity * a.trials + b.equity * b.trials) / n
+    se = math.sqrt((a.se * a.trials) ** 2 + (b.se * b.trials) ** 2) / n
+    return EquityEstimate(mean, max(0.0, mean - z * se), min(1.0, mean + z * se), n)
+
+def iter_equity_refine(
+    hero_hole: List[str],
+    board: List[str],
+    villain_range: List[List[str]],
+    batch: int = 1000,
+    max_trials: int = 50000,
+    z: float = 1.96,
+    exact_budget: Optional[int] = EXACT_BUDGET,
+) -> Iterator[EquityEstimate]:
+    """
+    Estimacions successives (acumulades) de l'equity, una per lot de `batch`
+    trials fins a max_trials; qui consumeix decideix quan parar. Si
+    l'enumeració exacta cap dins d'exact_budget, només dóna el resultat exacte.
+    """
+    hero_i, board_i, combos, deck, sampler = _prepare(hero_hole, board, villain_range)
+    if exact_budget and exact_work(len(board_i), len(combos), len(deck)) <= exact_budget:
+        wins, ties, total = _exact_counts(hero_i, board_i, combos, deck, _weights(sampler))
+        eq = (wins + 0.5 * ties) / max(1, total)
+        shown = total if sampler is None else exact_work(len(board_i), len(combos), len(deck))
+        yield EquityEstimate(eq, eq, eq, shown, True)
+        return
+
+    spot = _np_spot(hero_i, board_i, combos, deck, sampler) if _batch_ok(hero_i, board_i) else None
+    rng = np.random.default_rng() if np is not None else random
+
+    def step(k: int) -> Tuple[int, int]:
+        if spot is not None:
+            return _batch_counts(*spot, k, batch, rng)
+        return _mc_counts(hero_i, board_i, combos, deck, k, rng, sampler)
+
+    n = 0
+    s1 = s2 = 0.0  # sumes de x i x^2 amb x en {0, 0.5, 1}
+    while n < max_trials:
+        k = min(batch, max_trials - n)
+        wins, ties = step(k)
+        n += k
+        s1 += wins + 0.5 * ties
+        s2 += wins + 0.25 * ties
+        mean = s1 / n
+        se = math.sqrt(max(0.0, s2 / n - mean * mean) / n)
+        yield EquityEstimate(mean, max(0.0, mean - z * se), min(1.0, mean + z * se), n)
+
+# Trials mínims abans que el criteri del breakeven pugui aturar el Monte Carlo
+# (amb menys, l'interval és de ±0.03-0.04 i la decisió encara és soroll).
+MIN_TRIALS = 1000
+
+def _settled(est: EquityEstimate, target_se: Optional[float], breakeven: Optional[float], z: float,
+             min_trials: int = 0) -> bool:
+    """Prou precisa, o (amb min_trials fets) la decisió CALL/FOLD respecte del breakeven ja és clara."""
+    if est.exact:
+        return True
+    if target_se is None:
+        return False
+    return est.se <= target_se or (breakeven is not None and est.trials >= min_trials
+                                   and abs(est.equity - breakeven) > z * est.se)
+
+def estimate_equity_adaptive(
+    hero_hole: List[str],
+    board: List[str],
+    villain_range: List[List[str]],
+    target_se: float = 0.005,
+    breakeven: Optional[float] = None,
+    batch: int = 1000,
+    min_trials: int = MIN_TRIALS,
+    max_trials: int = 50000,
+    z: float = 1.96,
+    exact_budget: Optional[int] = EXACT_BUDGET,
+) -> EquityEstimate:
+    """
+    Monte Carlo per lots que s'atura quan l'error estàndard baixa de target_se
+    o quan |equity - breakeven| > z*se (la decisió CALL/FOLD ja és clara).
+    Retorna l'equity amb el seu interval de confiança i els trials usats.
+    Si l'enumeració exacta cap dins d'exact_budget, l'interval és degenerat.
+    """
+    est = None
+    for est in iter_equity_refine(hero_hole, board, villain_range, batch, max_trials, z, exact_budget):
+        if est.trials >= min_trials and _settled(est, target_se, breakeven, z):
+            break
+    return est
+
+def estimate_equity_anytime(
+    hero_hole: List[str],
+    board: List[str],
+    villain_range: List[List[str]],
+    deadline_ms: float,
+    on_update: Optional[Callable[[EquityEstimate], None]] = None,
+    target_se: Optional[float] = None,
+    breakeven: Optional[float] = None,
+    prior: Optional[EquityEstimate] = None,
+    batch: int = 500,
+    max_trials: int = 50000,
+    min_trials: int = MIN_TRIALS,
+    z: float = 1.96,
+    exact_budget: Optional[int] = EXACT_BUDGET,
+) -> EquityEstimate:
+    """
+    Millor estimació disponible dins de deadline_ms: refina per lots i para
+    quan s'acaba el temps (sempre fa com a mínim un lot), a max_trials o, amb
+    target_se, amb el criteri d'estimate_equity_adaptive (min_trials inclòs,
+    comptant els de prior). on_update(est) rep
+    cada estimació intermèdia. prior: estimació anterior del mateix spot, que
+    es combina amb els trials nous (refinament en diverses crides).
+    """
+    end = time.perf_counter() + deadline_ms / 1000.0
+    if exact_budget:
+        exact_budget = min(exact_budget, int(EXACT_PER_MS * deadline_ms))
+    if prior is not None and (prior.trials >= max_trials or _settled(prior, target_se, breakeven, z, min_trials)):
+        if on_update is not None:
+            on_update(prior)
+        return prior
+    left = max_trials - (prior.trials if prior is not None else 0)
+    est = prior
+    for part in iter_equity_refine(hero_hole, board, villain_range, batch, left, z, exact_budget):
+        est = merge_estimates(prior, part, z) if prior is not None else part
+        if on_update is not None:
+            on_update(est)
+        if time.perf_counter() >= end or _settled(est, target_se, breakeven, z, min_trials):
+            break
+    return est
+
+# ---------- Distribució de força (histograma d'equity, EHS²) ----------
+class EquityDistribution(NamedTuple):
+    equity: float                  # EHS: equity mitjana (igual que estimate_equity)
+    ehs2: float                    # E[HS²] sobre runouts
+    histogram: Tuple[float, ...]   # fracció de runouts per tram de HS (trams iguals a [0, 1])
+    runouts: int
+    exact: bool
+
+    @property
+    def hs_std(self) -> float:
+        """Dispersió de la força segons el runout (alta = mà que depèn del board)."""
+        return math.sqrt(max(0.0, self.ehs2 - self.equity * self.equity))
+
+def estimate_equity_distribution(
+    hero_hole: List[str],
+    board: List[str],
+    villain_range: List[List[str]],
+    bins: int = 10,
+    runouts: int = 400,
+    exact_budget: Optional[int] = EXACT_BUDGET,
+    rng=random,
+) -> EquityDistribution:
+    """
+    Equity i distribució de la força de l'heroi (HS: equity contra tot el
+    rang sobre un runout concret) en una sola passada: per a cada runout es
+    puntuen tots els combos vius, d'on surten alhora l'equity, E[HS²] i
+    l'histograma. Enumera tots els runouts si caben a exact_budget showdowns;
+    si no, en mostreja `runouts`. Cada runout pesa pels combos compatibles.
+    """
+    hero_i, board_i, combos, deck, sampler = _prepare(hero_hole, board, villain_range)
+    need = 5 - len(board_i)
+    exact = not need or bool(exact_budget and exact_work(len(board_i), len(combos), len(deck)) <= exact_budget)
+    runs = None if exact else (rng.sample(deck, need) for _ in range(runouts))
+    hs: List[Tuple[float, float]] = []
+    wins, ties, total = _exact_counts(hero_i, board_i, combos, deck, _weights(sampler), runs, hs)
+
+    hist = [0.0] * bins
+    s2 = 0.0
+    for score, n in hs:
+        x = score / n
+        s2 += n * x * x
+        hist[min(bins - 1, int(x * bins))] += n
+    total = max(total, 1e-12)
+    return EquityDistribution((wins + 0.5 * ties) / total, s2 / total,
+                              tuple(h / total for h in hist), len(hs), exact)
+
+# ---------- Equity multiway (N rivals) ----------
+class MultiwayEquity(NamedTuple):
+    equity: float               # win + tie_share (part esperada del pot)
+    win: float                  # prob. de guanyar sol
+    tie_share: float            # part esperada del pot en empats
+    per_opponent: List[float]   # part esperada del pot de cada rival
+    trials: int
+    ci_low: float = 0.0
+    ci_high: float = 1.0
+
+def estimate_equity_multiway(
+    hero_hole: List[str],
+    board: List[str],
+    villain_ranges: List[List[List[str]]],
+    trials: int = 5000,
+    target_se: Optional[float] = None,
+    breakeven: Optional[float] = None,
+    batch: int = 500,
+    min_trials: int = MIN_TRIALS,
+    z: float = 1.96,
+    rng=random,
+    deadline_ms: Optional[float] = None,
+    on_update: Optional[Callable[[MultiwayEquity], None]] = None,
+) -> MultiwayEquity:
+    """
+    Equity contra un rival per rang de villain_ranges. Cada trial reparteix un
+    combo independent a cada rival (sense conflictes de cartes; si un rang
+    queda bloquejat, cartes random), completa el board i puntua totes les
+    mans d'una passada. Amb target_se, s'atura abans com el mode adaptatiu
+    (el criteri del breakeven, només després de min_trials);
+    amb deadline_ms, quan s'acaba el temps (com a mínim un lot). on_update
+    rep el resultat parcial després de cada lot.
+    """
+    end = time.perf_counter() + deadline_ms / 1000.0 if deadline_ms is not None else None
+    hero_i = encode_many(hero_hole)
+    board_i = encode_many(board)
+    dead = card_mask(hero_i + board_i)
+    deck = [ci for ci in range(52) if not (dead >> ci) & 1]
+    ranges = [[(a, b, k, (1 << a) | (1 << b)) for a, b, k in _live_entries(vr, dead)]
+              for vr in villain_ranges]
+    samplers = [_live_sampler(vr, dead) if entries else None for vr, entries in zip(villain_ranges, ranges)]
+
+    need = 5 - len(board_i)
+    n_opp = len(ranges)
+    hero_board = hero_i + board_i
+    hero_k = sum(CARD_CODE[c] for c in hero_board)
+    board_k = sum(CARD_CODE[c] for c in board_i)
+    code = CARD_CODE
+    table = RANK_VALUE
+    value = value_from_code
+    rand = rng.random
+    n = len(deck)
+
+    wins = 0
+    tie_share = 0.0
+    s2 = 0.0
+    opp_share = [0.0] * n_opp
+    done = 0
+    while done < trials:
+        for _ in range(min(batch, trials - done)):
+            taken = 0
+            vils = []
+            for entries, sampler in zip(ranges, samplers):
+                picked = None
+                if entries:
+                    for _try in range(8):
+                        if sampler is None:
+                            e = entries[int(rand() * len(entries))]
+                        else:
+                            e = entries[sampler.draw(rand)]
+                        if not e[3] & taken:
+                            picked = e
+                            break
+                    else:
+                        live = [i for i, e in enumerate(entries) if not e[3] & taken]
+                        if live:
+                            if sampler is None:
+                                picked = entries[live[int(rand() * len(live))]]
+                            else:
+                                lw = [sampler.weights[i] for i in live]
+                                picked = entries[rng.choices(live, lw)[0]]
+                if picked is None:
+                    a = deck[int(rand() * n)]
+                    while (taken >> a) & 1:
+                        a = deck[int(rand() * n)]
+                    b = a
+                    while b == a or (taken >> b) & 1:
+                        b = deck[int(rand() * n)]
+                    picked = (a, b, code[a] + code[b], (1 << a) | (1 << b))
+                taken |= picked[3]
+                vils.append(picked)
+            run = []
+            rk = 0
+            while len(run) < need:
+                c = deck[int(rand() * n)]
+                if not (taken >> c) & 1:
+                    taken |= 1 << c
+                    run.append(c)
+                    rk += code[c]
+
+            hk = hero_k + rk
+            if ((hk >> SUIT_SHIFT) + 0x3333) & 0x8888:
+                best = value(hk, hero_board + run)
+            else:
+                best = table.get(hk & RANK_KEY_MASK) or value(hk, ())
+            hv = best
+            vvals = []
+            for a, b, vk, _m in vils:
+                vk += board_k + rk
+                if ((vk >> SUIT_SHIFT) + 0x3333) & 0x8888:
+                    vv = value(vk, board_i + run + [a, b])
+                else:
+                    vv = table.get(vk & RANK_KEY_MASK) or value(vk, ())
+                vvals.append(vv)
+                if vv > best:
+                    best = vv
+            n_best = vvals.count(best) + (hv == best)
+            share = 1.0 / n_best
+            if hv == best:
+                if n_best == 1:
+                    wins += 1
+                else:
+                    tie_share += share
+                s2 += share * share
+            for i, vv in enumerate(vvals):
+                if vv == best:
+                    opp_share[i] += share
+        done += min(batch, trials - done)
+        if on_update is not None:
+            on_update(_multiway_result(wins, tie_share, s2, opp_share, done, z))
+        if end is not None and time.perf_counter() >= end:
+            break
+        if target_se is not None and done < trials:
+            mean = (wins + tie_share) / done
+            se = math.sqrt(max(0.0, s2 / done - mean * mean) / done)
+            if se <= target_se or (breakeven is not None and done >= min_trials
+                                   and abs(mean - breakeven) > z * se):
+                break
+
+    return _multiway_result(wins, tie_share, s2, opp_share, done, z)
+
+def _multiway_result(wins: int, tie_share: float, s2: float, opp_share: List[float], done: int,
+                     z: float) -> MultiwayEquity:
+    d = max(1, done)
+    eq = (wins + tie_share) / d
+    se = math.sqrt(max(0.0, s2 / d - eq * eq) / d)
+    return MultiwayEquity(eq, wins / d, tie_share / d, [x / d for x in opp_share], done,
+                          max(0.0, eq - z * se), min(1.0, eq + z * se))
+
 def expand_range(mask: str) -> List[List[str]]:
-    """Converteix 'AKs', 'TT', 'A5s-A2s', 'KQo' a llista de combos."""
-    def gen_suited(a, b):
-        out = []
-        for s in SUITS:
-            out.append([a + s, b + s])
-        return out
-
-    def gen_off(a, b):
-        out = []
-        for s1 in SUITS:
-            for s2 in SUITS:
-                if s1 != s2:
-                    out.append([a + s1, b + s2])
-        return out
-
-    def gen_pair(r):
-        out = []
-        for i, s1 in enumerate(SUITS):
-            for s2 in SUITS[i+1:]:
-                out.append([r + s1, r + s2])
-        return out
-
-    mask = mask.strip()
-    if len(mask) == 2 and mask[0] == mask[1]:
-        return gen_pair(mask[0])
-    if len(mask) == 3 and mask[2] in "so":
-        a, b, typ = mask[0], mask[1], mask[2]
-        return gen_suited(a, b) if typ == 's' else gen_off(a, b)
-    if '-' in mask:  # e.g. A5s-A2s
-        lo, hi = mask.split('-')
-        if len(lo) == 3 and lo[2] == 's' and len(hi) == 3 and hi[2] == 's' and lo[0] == hi[0]:
-            a = lo[0]
-            r_lo = RANKS.index(lo[1])
-            r_hi = RANKS.index(hi[1])
-            out = []
-            for ri in range(min(r_lo, r_hi), max(r_lo, r_hi) + 1):
-                out += gen_suited(a, RANKS[ri])
-            return out
-    return []
+    """
+    Converteix una màscara de rang a llista de combos: 'AKs', 'TT', 'TT+',
+    'A2s+', 'KTo-K8o', '22-66', 'AK', 'AsKs', 'AKo:0.5'... (vegeu
+    modules.rangeparse). Els pesos es descarten (pes 0 = exclòs); les
+    màscares no vàlides donen []. Memoritzat per cadena.
+    """
+    try:
+        return range_combos(mask)
+    except RangeSyntaxError:
+        return []
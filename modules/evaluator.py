@@ -0,0 +1,256 @@
+# modules/evaluator.py
+"""
+Avaluador ràpid de mans (5..7 cartes) amb cartes codificades com a enters.
+
+Codificació: carta = rank*4 + suit (0..51), amb el mateix ordre que
+ALL_CARDS. Cada carta té un CARD_CODE que empaqueta el seu rank (3 bits per
+rank, 13 ranks) i el seu pal (un nibble per pal a partir del bit 40). Sumar
+els codes d'una mà dona en una sola operació el multiconjunt de ranks i el
+recompte de pals, que s'usen com a clau de taules precalculades.
+
+El valor retornat és un enter comparable directament: més gran = millor mà.
+"""
+from __future__ import annotations
+import itertools
+from typing import Dict, Iterable, List, Sequence
+
+try:  # opcional: només per a l'avaluació per lots
+    import numpy as np
+except ImportError:  # pragma: no cover - entorns sense numpy
+    np = None
+
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"  # clubs, diamonds, hearts, spades
+ALL_CARDS = [r + s for r in RANKS for s in SUITS]
+
+# Categories (mateix ordre que HAND_RANK_ORDER a equity.py)
+HIGH, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+CATEGORY_NAMES = (
+    "high", "pair", "two_pair", "trips", "straight",
+    "flush", "full_house", "quads", "straight_flush",
+)
+
+SUIT_SHIFT = 40
+RANK_KEY_MASK = (1 << 39) - 1
+_FLUSH_PROBE = 0x3333   # sumat als nibbles de pal: bit alt actiu <=> >=5 cartes
+_FLUSH_BITS = 0x8888
+
+CARD_INDEX: Dict[str, int] = {c: i for i, c in enumerate(ALL_CARDS)}
+CARD_CODE: List[int] = [
+    (1 << (3 * (i >> 2))) | (1 << (SUIT_SHIFT + 4 * (i & 3))) for i in range(52)
+]
+
+# ---------- Codificació ----------
+
+def encode(card: str) -> int:
+    return CARD_INDEX[card]
+
+def encode_many(cards: Iterable[str]) -> List[int]:
+    return [CARD_INDEX[c] for c in cards]
+
+def decode(ci: int) -> str:
+    return ALL_CARDS[ci]
+
+def code_sum(cards: Iterable[int]) -> int:
+    k = 0
+    for c in cards:
+        k += CARD_CODE[c]
+    return k
+
+def card_mask(cards: Iterable[int]) -> int:
+    """Bitmask de 52 bits amb les cartes donades."""
+    m = 0
+    for c in cards:
+        m |= 1 << c
+    return m
+
+# ---------- Combos (1326 parells de cartes) ----------
+# Índex fix per a cada combo (a < b); permet representar rangs com a arrays
+COMBO_CARDS: List[tuple] = [(a, b) for a in range(52) for b in range(a + 1, 52)]
+COMBO_MASK: List[int] = [(1 << a) | (1 << b) for a, b in COMBO_CARDS]
+COMBO_CODE: List[int] = [CARD_CODE[a] + CARD_CODE[b] for a, b in COMBO_CARDS]
+_COMBO_INDEX: Dict[tuple, int] = {ab: i for i, ab in enumerate(COMBO_CARDS)}
+
+def combo_index(a: int, b: int) -> int:
+    return _COMBO_INDEX[(a, b) if a < b else (b, a)]
+
+# ---------- Taules ----------
+
+def _pack(category: int, kickers: Sequence[int]) -> int:
+    v = category
+    for i in range(5):
+        v = (v << 4) | (kickers[i] if i < len(kickers) else 0)
+    return v
+
+def _straight_high(mask: int) -> int:
+    for high in range(12, 3, -1):
+        need = 0x1F << (high - 4)
+        if mask & need == need:
+            return high
+    if mask & 0x100F == 0x100F:  # roda A-2-3-4-5
+        return 3
+    return -1
+
+def _top_bits(mask: int, n: int) -> List[int]:
+    out = []
+    for r in range(12, -1, -1):
+        if mask >> r & 1:
+            out.append(r)
+            if len(out) == n:
+                break
+    return out
+
+STRAIGHT_HIGH: List[int] = [_straight_high(m) for m in range(1 << 13)]
+POPCOUNT: List[int] = [bin(m).count("1") for m in range(1 << 13)]
+
+def _flush_value(mask: int) -> int:
+    sh = STRAIGHT_HIGH[mask]
+    if sh >= 0:
+        return _pack(STRAIGHT_FLUSH, [sh])
+    return _pack(FLUSH, _top_bits(mask, 5))
+
+FLUSH_VALUE: List[int] = [
+    _flush_value(m) if POPCOUNT[m] >= 5 else 0 for m in range(1 << 13)
+]
+
+def _rank_value(key: int) -> int:
+    """Valor d'un multiconjunt de ranks sense color (clau empaquetada 3 bits/rank)."""
+    quads: List[int] = []
+    trips: List[int] = []
+    pairs: List[int] = []
+    mask = 0
+    for r in range(12, -1, -1):
+        n = (key >> (3 * r)) & 7
+        if not n:
+            continue
+        mask |= 1 << r
+        if n >= 4:
+            quads.append(r)
+        elif n == 3:
+            trips.append(r)
+        elif n == 2:
+            pairs.append(r)
+
+    if quads:
+        q = quads[0]
+        return _pack(QUADS, [q, _top_bits(mask & ~(1 << q), 1)[0]])
+    if trips and (len(trips) > 1 or pairs):
+        t = trips[0]
+        return _pack(FULL_HOUSE, [t, max(trips[1:] + pairs)])
+    sh = STRAIGHT_HIGH[mask]
+    if sh >= 0:
+        return _pack(STRAIGHT, [sh])
+    if trips:
+        t = trips[0]
+        return _pack(TRIPS, [t] + _top_bits(mask & ~(1 << t), 2))
+    if len(pairs) >= 2:
+        hi, lo = pairs[0], pairs[1]
+        return _pack(TWO_PAIR, [hi, lo] + _top_bits(mask & ~(1 << hi) & ~(1 << lo), 1))
+    if pairs:
+        p = pairs[0]
+        return _pack(PAIR, [p] + _top_bits(mask & ~(1 << p), 3))
+    return _pack(HIGH, _top_bits(mask, 5))
+
+# Taula de ranks: s'omple sota demanda (~50k claus possibles per a 7 cartes)
+RANK_VALUE: Dict[int, int] = {}
+
+# ---------- Avaluació ----------
+
+def value_from_code(k: int, cards: Iterable[int]) -> int:
+    """
+    Valor d'una mà a partir de la suma de CARD_CODE (k) i les seves cartes.
+    Les cartes només es recorren si hi ha color.
+    """
+    sc = k >> SUIT_SHIFT
+    if (sc + _FLUSH_PROBE) & _FLUSH_BITS:
+        suit = 0
+        while (sc >> (4 * suit)) & 15 < 5:
+            suit += 1
+        mask = 0
+        for c in cards:
+            if c & 3 == suit:
+                mask |= 1 << (c >> 2)
+        return FLUSH_VALUE[mask]
+    rk = k & RANK_KEY_MASK
+    v = RANK_VALUE.get(rk)
+    if v is None:
+        v = RANK_VALUE[rk] = _rank_value(rk)
+    return v
+
+def hand_value(cards: Sequence[int]) -> int:
+    """Valor comparable (més gran = millor) de 5..7 cartes codificades."""
+    k = 0
+    for c in cards:
+        k += CARD_CODE[c]
+    return value_from_code(k, cards)
+
+def hand_value_str(cards: Iterable[str]) -> int:
+    return hand_value(encode_many(cards))
+
+def category_of(value: int) -> int:
+    return value >> 20
+
+def category_name(value: int) -> str:
+    return CATEGORY_NAMES[value >> 20]
+
+# ---------- Avaluació vectoritzada (numpy) ----------
+_NP_TABLES = None
+
+def _np_tables():
+    """Taules numpy (codes, color, claus de rank ordenades) construïdes un sol cop."""
+    global _NP_TABLES
+    if _NP_TABLES is None:
+        keys = []
+        for combo in itertools.combinations_with_replacement(range(13), 7):
+            if max(combo.count(r) for r in set(combo)) > 4:
+                continue
+            k = 0
+            for r in combo:
+                k += 1 << (3 * r)
+            keys.append(k)
+        keys.sort()
+        vals = []
+        for k in keys:
+            v = RANK_VALUE.get(k)
+            if v is None:
+                v = RANK_VALUE[k] = _rank_value(k)
+            vals.append(v)
+        _NP_TABLES = (
+            np.array(CARD_CODE, dtype=np.int64),
+            np.array(FLUSH_VALUE, dtype=np.int64),
+            np.array(keys, dtype=np.int64),
+            np.array(vals, dtype=np.int64),
+        )
+    return _NP_TABLES
+
+def warm_up() -> None:
+    """Construeix ara les taules numpy (~0.5s) perquè no caiguin dins d'un pressupost de latència."""
+    if np is not None:
+        _np_tables()
+
+def hand_values_np(cards):
+    """
+    Valors de moltes mans de 7 cartes alhora. cards: array (N, 7) d'enters
+    0..51. Retorna array (N,) int64 comparable igual que hand_value.
+    La taula només té claus de 7 cartes: qualsevol altra mida és ValueError.
+    """
+    codes_t, flush_t, keys_t, vals_t = _np_tables()
+    cards = np.asarray(cards, dtype=np.int64)
+    k = codes_t[cards].sum(axis=1)
+    rk = k & RANK_KEY_MASK
+    idx = np.minimum(np.searchsorted(keys_t, rk), keys_t.size - 1)
+    if not (keys_t[idx] == rk).all():
+        raise ValueError(f"hand_values_np: calen mans de 7 cartes, no {cards.shape[-1]}")
+    out = vals_t[idx]
+
+    sc = k >> SUIT_SHIFT
+    fl = np.nonzero((sc + _FLUSH_PROBE) & _FLUSH_BITS)[0]
+    if fl.size:
+        fsc = sc[fl]
+        suit = np.zeros(fl.size, dtype=np.int64)
+        for s in range(4):
+            suit[((fsc >> (4 * s)) & 15) >= 5] = s
+        fc = cards[fl]
+        bits = np.where((fc & 3) == suit[:, None], 1 << (fc >> 2), 0)
+        out[fl] = flush_t[bits.sum(axis=1)]
+    return out
@@ -0,0 +1,149 @@
+# modules/handlog.py
+"""
+Registre estructurat de mans (SQLite) amb escriptura per lots i rotació.
+
+Cada mà és una fila amb camps tipats (decisió, conf, p_win, SPR, sizing,
+to_call, pot...), no una etiqueta de text. Les files s'acumulen en memòria i
+s'escriuen en una sola transacció quan n'hi ha `batch` o han passat
+`flush_secs` des de l'última escriptura; close() (o atexit) buida la resta.
+
+Rotació: un fitxer per mes (hands_YYYYMM.sqlite) i, si passa de
+`max_bytes`, el següent (hands_YYYYMM_2.sqlite, ...). iter_hands() recorre
+tots els fitxers d'un directori amb un filtre SQL.
+"""
+from __future__ import annotations
+import atexit
+import datetime as dt
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# (nom, tipus SQLite) en l'ordre de la taula
+COLUMNS = (
+    ("ts", "TEXT"),          # ISO local, segons
+    ("hand_id", "INTEGER"),
+    ("table_id", "TEXT"),
+    ("outcome", "TEXT"),
+    ("net", "REAL"),
+    ("pot", "REAL"),
+    ("to_call", "REAL"),
+    ("hero", "TEXT"),        # "As Kd"
+    ("board", "TEXT"),       # "Qh 7d 2c"
+    ("street", "TEXT"),
+    ("decision", "TEXT"),
+    ("conf", "REAL"),
+    ("p_win", "REAL"),
+    ("spr", "REAL"),
+    ("sizing", "REAL"),      # % del pot
+    ("trials", "INTEGER"),
+)
+FIELDS = tuple(name for name, _ in COLUMNS)
+SCHEMA_VERSION = 1
+
+DEFAULT_BATCH = 50
+DEFAULT_FLUSH_SECS = 30.0
+DEFAULT_MAX_BYTES = 64 << 20
+
+_FILE_RE = re.compile(r"_(\d{6})(?:_(\d+))?\.sqlite$")
+
+def _connect(path: Path) -> sqlite3.Connection:
+    con = sqlite3.connect(str(path))
+    if con.execute("PRAGMA user_version").fetchone()[0] == 0:
+        cols = ", ".join(f"{name} {kind}" for name, kind in COLUMNS)
+        con.executescript(
+            f"CREATE TABLE IF NOT EXISTS hands ({cols});"
+            "CREATE INDEX IF NOT EXISTS hands_ts ON hands(ts);"
+            "CREATE INDEX IF NOT EXISTS hands_decision ON hands(decision);"
+            f"PRAGMA user_version = {SCHEMA_VERSION};"
+        )
+    return con
+
+class HandLog:
+    """Escriptor per lots i amb rotació; segur entre fils."""
+
+    def __init__(self, log_dir, batch: int = DEFAULT_BATCH, flush_secs: float = DEFAULT_FLUSH_SECS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, prefix: str = "hands"):
+        self.log_dir = Path(log_dir)
+        self.batch = max(1, batch)
+        self.flush_secs = flush_secs
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self._rows: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def log(self, **fields) -> None:
+        """Afegeix una mà (camps de FIELDS; els que falten són NULL)."""
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"camps desconeguts al registre de mans: {sorted(unknown)}")
+        fields.setdefault("ts", dt.datetime.now().isoformat(timespec="seconds"))
+        with self._lock:
+            self._rows.append(tuple(fields.get(name) for name in FIELDS))
+            due = len(self._rows) >= self.batch or time.monotonic() - self._last_flush >= self.flush_secs
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Escriu les files pendents, una transacció per fitxer de destinació."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return
+            by_month: Dict[str, List[tuple]] = {}
+            for row in rows:
+                by_month.setdefault(row[0][:7].replace("-", ""), []).append(row)
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            marks = ", ".join("?" * len(FIELDS))
+            for month, month_rows in by_month.items():
+                con = _connect(self._path_for(month))
+                try:
+                    with con:
+                        con.executemany(f"INSERT INTO hands ({', '.join(FIELDS)}) VALUES ({marks})", month_rows)
+                finally:
+                    con.close()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _path_for(self, month: str) -> Path:
+        """Fitxer actiu del mes: l'últim de la sèrie mentre no passi de max_bytes."""
+        part = 1
+        while True:
+            path = self.log_dir / (f"{self.prefix}_{month}.sqlite" if part == 1
+                                   else f"{self.prefix}_{month}_{part}.sqlite")
+            if not path.exists() or path.stat().st_size < self.max_bytes:
+                return path
+            part += 1
+
+def log_files(log_dir, prefix: str = "hands") -> List[Path]:
+    """Fitxers del registre en ordre cronològic (mes, part)."""
+    files = []
+    for path in Path(log_dir).glob(f"{prefix}_*.sqlite"):
+        m = _FILE_RE.search(path.name)
+        if m:
+            files.append((m.group(1), int(m.group(2) or 1), path))
+    return [path for _, _, path in sorted(files)]
+
+def iter_hands(log_dir, where: str = "", params: Sequence = (), prefix: str = "hands",
+               months: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+    """
+    Mans de tots els fitxers (o només dels mesos 'YYYYMM' de `months`) com a
+    dicts, en ordre de ts. where: condició SQL amb '?' (p. ex. "decision = ?").
+    """
+    sql = "SELECT * FROM hands" + (f" WHERE {where}" if where else "") + " ORDER BY ts"
+    for path in log_files(log_dir, prefix):
+        if months is not None and _FILE_RE.search(path.name).group(1) not in months:
+            continue
+        con = sqlite3.connect(str(path))
+        con.row_factory = sqlite3.Row
+        try:
+            for row in con.execute(sql, tuple(params)):
+                yield dict(row)
+        finally:
+            con.close()
@@ -0,0 +1,100 @@
+# modules/isomorph.py
+"""
+Canonicalització per isomorfisme de pals i memòria cau de resultats d'equity.
+
+Dues situacions que només difereixen per una permutació de pals (p.ex.
+As Ks / Th Qh 2s i Ah Kh / Tc Qc 2h) tenen la mateixa equity contra un rang
+simètric; comparteixen clau canònica i, per tant, entrada de cache.
+"""
+from __future__ import annotations
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .evaluator import ALL_CARDS, encode_many
+
+_PERMS: List[Tuple[int, ...]] = list(itertools.permutations(range(4)))
+
+def _apply(cards: Iterable[int], perm: Tuple[int, ...]) -> Tuple[int, ...]:
+    return tuple(sorted((c & ~3) | perm[c & 3] for c in cards))
+
+def _apply_range(combos: List[List[int]], perm: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+    return tuple(sorted(_apply(c, perm) for c in combos))
+
+def canonicalize(
+    hero: List[str],
+    board: List[str],
+    villain_range: Optional[List[List[str]]] = None,
+) -> Tuple[Tuple[str, ...], Tuple[str, ...], Optional[Tuple[Tuple[str, ...], ...]]]:
+    """
+    Forma canònica de (hero, board, rang) sota permutacions de pals: la
+    permutació que dona la tupla (hero, board) lexicogràficament mínima.
+    L'ordre de les cartes dins de hero/board no importa. Si es passa rang,
+    entre permutacions empatades es tria la que minimitza el rang.
+    """
+    h = encode_many(hero)
+    b = encode_many(board)
+    best_key = None
+    tied: List[Tuple[int, ...]] = []
+    for perm in _PERMS:
+        key = (_apply(h, perm), _apply(b, perm))
+        if best_key is None or key < best_key:
+            best_key, tied = key, [perm]
+        elif key == best_key:
+            tied.append(perm)
+
+    rng_key = None
+    if villain_range is not None:
+        combos = [encode_many(c) for c in villain_range]
+        rng_key = min(_apply_range(combos, perm) for perm in tied)
+
+    def dec(cs: Iterable[int]) -> Tuple[str, ...]:
+        return tuple(ALL_CARDS[c] for c in cs)
+
+    return (
+        dec(best_key[0]),
+        dec(best_key[1]),
+        tuple(dec(c) for c in rng_key) if rng_key is not None else None,
+    )
+
+class EquityCache:
+    """LRU acotada i segura entre fils, amb comptadors d'encerts/errades."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            try:
+                val = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return val
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
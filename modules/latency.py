@@ -0,0 +1,80 @@
+# modules/latency.py
+"""
+Mètriques de latència en mil·lisegons, globals i per clau (carrer, taula...).
+Percentils per rang més proper sobre les mostres guardades; amb `window`,
+només es guarden les últimes `window` mostres per sèrie (memòria fitada en
+processos de llarga durada) i n, mitjana i màxim segueixen sent de tot.
+"""
+from __future__ import annotations
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Percentil q (0..100) d'una llista ja ordenada; 0.0 si és buida."""
+    if not sorted_samples:
+        return 0.0
+    k = max(0, min(len(sorted_samples) - 1, math.ceil(q / 100.0 * len(sorted_samples)) - 1))
+    return sorted_samples[k]
+
+class _Series:
+    __slots__ = ("samples", "n", "total", "max")
+
+    def __init__(self, window: Optional[int]):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        self.samples.append(ms)
+        self.n += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+class LatencyStats:
+    """
+    Acumula latències (ms) i en resumeix n, mitjana, p50/p90/p99 i màxim.
+    window: mostres guardades per sèrie per als percentils (None = totes).
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = window
+        self._all = _Series(window)
+        self._by_key: Dict[str, _Series] = {}
+        self._lock = threading.Lock()
+
+    def add(self, ms: float, key: Optional[str] = None) -> None:
+        with self._lock:
+            self._all.add(ms)
+            if key is not None:
+                series = self._by_key.get(key)
+                if series is None:
+                    series = self._by_key[key] = _Series(self.window)
+                series.add(ms)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._by_key)
+
+    def summary(self, key: Optional[str] = None) -> Dict[str, float]:
+        with self._lock:
+            series = self._all if key is None else self._by_key.get(key)
+            if series is None:
+                series = _Series(0)
+            xs = sorted(series.samples)
+            n, total, mx = series.n, series.total, series.max
+        return {
+            "n": n,
+            "mean": total / n if n else 0.0,
+            "p50": percentile(xs, 50),
+            "p90": percentile(xs, 90),
+            "p99": percentile(xs, 99),
+            "max": mx,
+        }
+
+    def format(self, key: Optional[str] = None) -> str:
+        s = self.summary(key)
+        return (f"n={s['n']} mean={s['mean']:.1f}ms p50={s['p50']:.1f}ms "
+                f"p90={s['p90']:.1f}ms p99={s['p99']:.1f}ms max={s['max']:.1f}ms")
@@ -1,34 +1,98 @@
 # logic.py — TIQQUN PRO
-from typing import NamedTuple, List
+import math
+import threading
+from typing import Callable, NamedTuple, List, Optional, Tuple
 
 # NOVES DEPENDÈNCIES (Paquet PRO)
-from modules.equity import estimate_equity
-from modules.ranges import PreflopRanges
+from modules.equity import (
+    MIN_TRIALS, EquityDistribution, EquityEstimate, estimate_equity_adaptive, estimate_equity_anytime,
+    estimate_equity_batch, estimate_equity_distribution, estimate_equity_multiway, merge_estimates,
+)
+from modules.ranges import CompiledRange, PreflopRanges
+from modules.preflop_table import PreflopEquityTable, default_table_path
+from modules.isomorph import EquityCache, canonicalize
+from modules.parallel import estimate_equity_parallel
+from modules.draws import analyze_draws
 
-# Precarrega rangs (JSON a data/refs/preflop_ranges.json)
-_RANGES = PreflopRanges()
+# Rangs i taula preflop es carreguen al primer ús (importar no llegeix res).
+# Rutes per defecte relatives al repo (o TIQQUN_RANGES / TIQQUN_PREFLOP_TABLE);
+# configure_data les canvia explícitament.
+_DATA_LOCK = threading.Lock()
+_RANGES_PATH: Optional[str] = None
+_TABLE_PATH: Optional[str] = None
+_RANGES: Optional[PreflopRanges] = None
+_PREFLOP: Optional[PreflopEquityTable] = None
+_PREFLOP_LOADED = False
+
+def configure_data(ranges_path: Optional[str] = None, table_path: Optional[str] = None) -> None:
+    """Canvia les rutes de rangs/taula; es recarreguen al següent ús."""
+    global _RANGES_PATH, _TABLE_PATH, _RANGES, _PREFLOP, _PREFLOP_LOADED
+    with _DATA_LOCK:
+        _RANGES_PATH, _TABLE_PATH = ranges_path, table_path
+        _RANGES, _PREFLOP, _PREFLOP_LOADED = None, None, False
+    _EQ_CACHE.clear()
+
+def get_ranges() -> PreflopRanges:
+    """Rangs preflop (JSON + cache binària), carregats un sol cop i entre fils."""
+    global _RANGES
+    ranges = _RANGES
+    if ranges is None:
+        with _DATA_LOCK:
+            if _RANGES is None:
+                # sense JSON: rangs buits, els motors sortegen rival random
+                _RANGES = PreflopRanges(_RANGES_PATH, missing_ok=True)
+            ranges = _RANGES
+    return ranges
+
+def get_preflop_table() -> Optional[PreflopEquityTable]:
+    """Taula preflop precalculada (scripts/build_preflop_table.py); None si no hi és o és obsoleta."""
+    global _PREFLOP, _PREFLOP_LOADED
+    if not _PREFLOP_LOADED:
+        digest = get_ranges().weights_digest
+        with _DATA_LOCK:
+            if not _PREFLOP_LOADED:
+                table = PreflopEquityTable.open(str(_TABLE_PATH or default_table_path()))
+                if table is not None and not table.matches(digest):
+                    table = None  # obsoleta respecte del JSON de rangs
+                _PREFLOP, _PREFLOP_LOADED = table, True
+    return _PREFLOP
+
+# Resultats d'equity per spot i posició/acció del rival. Si el rang és simètric
+# en pals, la clau és la forma canònica (isomorfisme de pals); si no (combos
+# explícits com 'AhAd'), les cartes tal qual: permutar-les canviaria l'equity.
+_EQ_CACHE = EquityCache(maxsize=4096)
+
+def _spot_cards(hero: List[str], board: List[str],
+                villain: CompiledRange) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """(hero, board) per simular i per a la clau de cache."""
+    if villain.suit_symmetric:
+        c_hero, c_board, _ = canonicalize(hero, board)
+        return c_hero, c_board
+    return tuple(sorted(hero)), tuple(sorted(board))
+
+def equity_cache_stats() -> dict:
+    return _EQ_CACHE.stats()
 
 class TechEval(NamedTuple):
     p_win: float          # Equity real 0..1
-    p_improve: float      # Aproximació simple a millora (draws)
+    p_improve: float      # P(millorar abans del river) per outs exactes
     ev_hint: float        # EV normalitzat [-1..1] via pot odds
     position_score: float # Posicional 0..1
+    # Opcionals (mode adaptatiu): interval de confiança de p_win i trials usats
+    p_win_ci: Optional[Tuple[float, float]] = None
+    trials: Optional[int] = None
+    # Opcionals (mode distribució): E[HS²] i histograma de HS sobre runouts
+    ehs2: Optional[float] = None
+    hs_hist: Optional[Tuple[float, ...]] = None
 
 # ----------------------- UTILITATS EXISTENTS -----------------------
 
 def estimate_p_improve(hero: List[str], board: List[str]) -> float:
     """
-    Aproximació lleugera a la probabilitat de millorar (flush/straight draws).
-    Mantinc l'esperit del teu càlcul original, però pots substituir-ho per
-    un càlcul exacte si vols en una següent iteració.
+    Probabilitat exacta de millorar abans del river, enumerant els outs reals
+    (modules.draws, memoritzat i compartit amb la UI). Preflop i al river, 0.
     """
-    if not hero:
-        return 0.0
-    has_suit_pair = len(hero) >= 2 and hero[0][-1] == hero[1][-1]
-    suit_on_board = sum(1 for c in board if c and hero and c[-1] == hero[0][-1])
-    p_flush_draw = 0.18 if (has_suit_pair and suit_on_board >= 2) else 0.06
-    p_straight_draw = 0.10
-    return min(0.6, p_flush_draw + p_straight_draw)
+    return analyze_draws(hero, board).p_river
 
 def pot_odds_ev(pot: float, to_call: float, p_win: float, reward_mult: float = 1.0) -> float:
     """
@@ -58,14 +122,193 @@ def estimate_p_win(
     posicio_rival: str = "CO",
     accio_rival: str = "open",
     trials: int = 20000,
+    parallel: bool = False,
+    opponents: Optional[int] = None,
 ) -> float:
     """
     Equity real de l'Hero contra el rang del rival segons posició/acció,
-    via Monte Carlo. Si el rang queda buit (per cartes bloquejades),
-    fa sample de rival random (gestionat a estimate_equity).
+    via Monte Carlo per lots (numpy si està disponible). Si el rang queda
+    buit (per cartes bloquejades), fa sample de rival random.
+    Preflop, si hi ha taula precalculada, és una consulta directa. La resta
+    passa per la cache canònica (isomorfisme de pals, si el rang és simètric
+    en pals; si no, per cartes exactes).
+    parallel=True reparteix els trials en el pool de processos (modules.parallel).
+    opponents: rivals actius (per defecte players-1); amb més d'un, equity
+    multiway amb un combo del rang per a cada rival.
+    """
+    n_opp = _n_opponents(players, opponents)
+    villain_combos = get_ranges().compiled_for(posicio_rival, accio_rival)
+    table = get_preflop_table() if n_opp == 1 and not board and villain_combos.suit_symmetric else None
+    if table is not None:
+        eq = table.lookup(hero, posicio_rival, accio_rival)
+        if eq is not None:
+            return eq
+    c_hero, c_board = _spot_cards(hero, board, villain_combos)
+    key = (c_hero, c_board, posicio_rival, accio_rival, n_opp, trials)
+    eq = _EQ_CACHE.get(key)
+    if eq is None:
+        if n_opp > 1:
+            eq = estimate_equity_multiway(list(c_hero), list(c_board), [villain_combos] * n_opp,
+                                          trials=_multiway_trials(trials, n_opp)).equity
+        else:
+            equity_fn = estimate_equity_parallel if parallel else estimate_equity_batch
+            eq = equity_fn(list(c_hero), list(c_board), villain_combos, trials=trials)
+        _EQ_CACHE.put(key, eq)
+    return eq
+
+def _n_opponents(players: int, opponents: Optional[int]) -> int:
+    return max(1, opponents if opponents is not None else players - 1)
+
+def _multiway_trials(trials: int, n_opp: int) -> int:
+    """Cada trial multiway puntua n_opp+1 mans: mantenim el cost ~constant."""
+    return max(2000, (2 * trials) // (n_opp + 1))
+
+def estimate_p_win_adaptive(
+    hero: List[str],
+    board: List[str],
+    players: int,
+    posicio_rival: str = "CO",
+    accio_rival: str = "open",
+    breakeven: Optional[float] = None,
+    target_se: float = 0.005,
+    max_trials: int = 50000,
+    opponents: Optional[int] = None,
+) -> EquityEstimate:
+    """
+    Com estimate_p_win però amb Monte Carlo adaptatiu: s'atura quan l'error
+    estàndard és prou petit o quan la decisió respecte del breakeven ja és
+    clara. Un resultat en cache es reutilitza si també és prou precís per a
+    aquest breakeven.
+    """
+    n_opp = _n_opponents(players, opponents)
+    villain_combos = get_ranges().compiled_for(posicio_rival, accio_rival)
+    table = get_preflop_table() if n_opp == 1 and not board and villain_combos.suit_symmetric else None
+    if table is not None:
+        eq = table.lookup(hero, posicio_rival, accio_rival)
+        if eq is not None:
+            half = 1.96 * math.sqrt(eq * (1 - eq) / max(1, table.trials))
+            return EquityEstimate(eq, max(0.0, eq - half), min(1.0, eq + half), table.trials)
+    c_hero, c_board = _spot_cards(hero, board, villain_combos)
+    key = (c_hero, c_board, posicio_rival, accio_rival, n_opp, "adaptive", target_se)
+    est = _EQ_CACHE.get(key)
+    if est is not None and (est.exact or est.se <= target_se or
+                            (breakeven is not None and est.trials >= MIN_TRIALS
+                             and abs(est.equity - breakeven) > 1.96 * est.se)):
+        return est
+    if n_opp > 1:
+        mw = estimate_equity_multiway(list(c_hero), list(c_board), [villain_combos] * n_opp,
+                                      trials=_multiway_trials(max_trials, n_opp),
+                                      target_se=target_se, breakeven=breakeven)
+        est = EquityEstimate(mw.equity, mw.ci_low, mw.ci_high, mw.trials)
+    else:
+        est = estimate_equity_adaptive(list(c_hero), list(c_board), villain_combos,
+                                       target_se=target_se, breakeven=breakeven, max_trials=max_trials)
+    _EQ_CACHE.put(key, est)
+    return est
+
+def estimate_p_win_anytime(
+    hero: List[str],
+    board: List[str],
+    players: int,
+    posicio_rival: str = "CO",
+    accio_rival: str = "open",
+    deadline_ms: float = 50.0,
+    breakeven: Optional[float] = None,
+    target_se: float = 0.005,
+    max_trials: int = 50000,
+    opponents: Optional[int] = None,
+    on_update: Optional[Callable[[EquityEstimate], None]] = None,
+    resume: Optional[EquityEstimate] = None,
+) -> EquityEstimate:
+    """
+    Com estimate_p_win_adaptive però amb pressupost de temps: retorna la millor
+    estimació dins de deadline_ms i passa cada refinament a on_update.
+    Comparteix la cache del mode adaptatiu; una estimació a mitges (de la
+    cache o `resume`) es reprèn amb trials nous en lloc de començar de zero.
+    """
+    n_opp = _n_opponents(players, opponents)
+    villain_combos = get_ranges().compiled_for(posicio_rival, accio_rival)
+    table = get_preflop_table() if n_opp == 1 and not board and villain_combos.suit_symmetric else None
+    if table is not None:
+        eq = table.lookup(hero, posicio_rival, accio_rival)
+        if eq is not None:
+            half = 1.96 * math.sqrt(eq * (1 - eq) / max(1, table.trials))
+            est = EquityEstimate(eq, max(0.0, eq - half), min(1.0, eq + half), table.trials)
+            if on_update is not None:
+                on_update(est)
+            return est
+    c_hero, c_board = _spot_cards(hero, board, villain_combos)
+    key = (c_hero, c_board, posicio_rival, accio_rival, n_opp, "adaptive", target_se)
+    prev = _EQ_CACHE.get(key)
+    if resume is not None and (prev is None or resume.trials > prev.trials):
+        prev = resume
+    if n_opp > 1:
+        cap = _multiway_trials(max_trials, n_opp)
+        if prev is not None and (prev.trials >= cap or prev.se <= target_se or
+                                 (breakeven is not None and prev.trials >= MIN_TRIALS
+                                  and abs(prev.equity - breakeven) > 1.96 * prev.se)):
+            if on_update is not None:
+                on_update(prev)
+            return prev
+
+        def merged(mw) -> EquityEstimate:
+            part = EquityEstimate(mw.equity, mw.ci_low, mw.ci_high, mw.trials)
+            return merge_estimates(prev, part) if prev is not None else part
+
+        mw = estimate_equity_multiway(list(c_hero), list(c_board), [villain_combos] * n_opp,
+                                      trials=cap - (prev.trials if prev is not None else 0),
+                                      target_se=target_se, breakeven=breakeven, deadline_ms=deadline_ms,
+                                      min_trials=MIN_TRIALS - (prev.trials if prev is not None else 0),
+                                      on_update=(lambda mw: on_update(merged(mw))) if on_update else None)
+        est = merged(mw)
+    else:
+        est = estimate_equity_anytime(list(c_hero), list(c_board), villain_combos, deadline_ms,
+                                      on_update=on_update, target_se=target_se, breakeven=breakeven,
+                                      prior=prev, max_trials=max_trials)
+    _EQ_CACHE.put(key, est)
+    return est
+
+def estimate_p_win_distribution(
+    hero: List[str],
+    board: List[str],
+    posicio_rival: str = "CO",
+    accio_rival: str = "open",
+    bins: int = 10,
+) -> EquityDistribution:
+    """
+    Equity heads-up amb la distribució de força (EHS², histograma de HS) de
+    la mateixa passada. Memoritzat com estimate_p_win.
+    """
+    villain_combos = get_ranges().compiled_for(posicio_rival, accio_rival)
+    c_hero, c_board = _spot_cards(hero, board, villain_combos)
+    key = (c_hero, c_board, posicio_rival, accio_rival, 1, "dist", bins)
+    dist = _EQ_CACHE.get(key)
+    if dist is None:
+        dist = estimate_equity_distribution(list(c_hero), list(c_board), villain_combos, bins=bins)
+        _EQ_CACHE.put(key, dist)
+    return dist
+
+def is_settled(tech: TechEval, pot: float, to_call: float, trials: int = 20000,
+               target_se: float = 0.005, players: int = 2, opponents: Optional[int] = None) -> bool:
+    """
+    Cal refinar més p_win? No si és exacta/sense interval, si ja ha arribat al
+    màxim de trials (el mateix límit que aplica l'estimador: `trials`
+    heads-up, _multiway_trials si hi ha més rivals), si és prou precisa o si
+    la decisió pel breakeven ja és clara amb MIN_TRIALS fets (mateix criteri
+    que _EQ_CACHE).
     """
-    villain_combos = _RANGES.combos_for(posicio_rival, accio_rival)
-    return estimate_equity(hero, board, villain_combos, trials=trials)
+    if tech.p_win_ci is None:
+        return True
+    n_opp = _n_opponents(players, opponents)
+    cap = trials if n_opp == 1 else _multiway_trials(trials, n_opp)
+    if tech.trials is not None and tech.trials >= cap:
+        return True
+    from modules.motor import breakeven_equity  # motor importa logic
+    lo, hi = tech.p_win_ci
+    se = (hi - lo) / (2 * 1.96)
+    if to_call <= 0 or (tech.trials or 0) < MIN_TRIALS:
+        return se <= target_se  # sense breakeven, o massa pocs trials per fer-lo servir
+    return se <= target_se or abs(tech.p_win - breakeven_equity(pot, to_call)) > 1.96 * se
 
 def tech_eval(
     hero: List[str],
@@ -77,13 +320,57 @@ def tech_eval(
     posicio_rival: str = "CO",
     accio_rival: str = "open",
     trials: int = 20000,
+    adaptive: bool = False,
+    target_se: float = 0.005,
+    parallel: bool = False,
+    opponents: Optional[int] = None,
+    distribution: bool = False,
+    prior: Optional[TechEval] = None,
+    deadline_ms: Optional[float] = None,
+    on_update: Optional[Callable[[EquityEstimate], None]] = None,
 ) -> TechEval:
     """
     Aglutina mètriques tècniques. Manté la teva interfície antiga però
     ara permet passar posició/acció del rival per ajustar el rang.
+    Amb adaptive=True, `trials` és el màxim i s'omplen p_win_ci/trials.
+    Amb parallel=True (mode fix), els trials es reparteixen entre processos.
+    opponents: rivals encara a la mà (per defecte players-1).
+    Amb distribution=True (només heads-up), p_win surt de la passada que
+    també omple ehs2/hs_hist.
+    prior: avaluació anterior del mateix spot (mateixes cartes, rang i rivals);
+    si encara és prou precisa per al breakeven nou, només es recalculen EV i
+    posició (l'equity no depèn del pot); si no, es reprèn en mode anytime.
+    deadline_ms (mode adaptatiu): pressupost de temps per a p_win; retorna la
+    millor estimació en aquest temps i passa cada refinament a on_update.
     """
-    pwin = estimate_p_win(hero, board, players, posicio_rival, accio_rival, trials=trials)
+    if prior is not None and (not adaptive or
+                              is_settled(prior, pot, to_call, trials, target_se, players, opponents)):
+        return prior._replace(ev_hint=pot_odds_ev(pot, to_call, prior.p_win, reward_mult=1.0),
+                              position_score=position_score(seat_num, players))
+    ci = used = ehs2 = hist = None
+    if distribution and _n_opponents(players, opponents) == 1:
+        dist = estimate_p_win_distribution(hero, board, posicio_rival, accio_rival)
+        pwin, ehs2, hist = dist.equity, dist.ehs2, dist.histogram
+    elif adaptive:
+        from modules.motor import breakeven_equity  # motor importa logic
+        # amb to_call 0 la decisió no depèn del breakeven (seria 0 i aturaria el MC de seguida)
+        breakeven = breakeven_equity(pot, to_call) if to_call > 0 else None
+        if deadline_ms is not None:
+            resume = None
+            if prior is not None and prior.p_win_ci is not None and prior.trials:
+                resume = EquityEstimate(prior.p_win, prior.p_win_ci[0], prior.p_win_ci[1], prior.trials)
+            est = estimate_p_win_anytime(hero, board, players, posicio_rival, accio_rival, deadline_ms,
+                                         breakeven=breakeven, target_se=target_se,
+                                         max_trials=trials, opponents=opponents, on_update=on_update,
+                                         resume=resume)
+        else:
+            est = estimate_p_win_adaptive(hero, board, players, posicio_rival, accio_rival, breakeven=breakeven,
+                                          target_se=target_se, max_trials=trials, opponents=opponents)
+        pwin, ci, used = est.equity, (est.ci_low, est.ci_high), est.trials
+    else:
+        pwin = estimate_p_win(hero, board, players, posicio_rival, accio_rival, trials=trials, parallel=parallel,
+                              opponents=opponents)
     pimp = estimate_p_improve(hero, board)
     evh  = pot_odds_ev(pot, to_call, pwin, reward_mult=1.0)
     pos  = position_score(seat_num, players)
-    return TechEval(pwin, pimp, evh, pos)
+    return TechEval(pwin, pimp, evh, pos, ci, used, ehs2, hist)
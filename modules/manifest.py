@@ -0,0 +1,142 @@
+# modules/manifest.py
+"""
+Manifest per a processos incrementals (ingesta PHH, estadístiques).
+
+Per cada fitxer d'entrada guarda hash del contingut, mida, mtime, sortides
+generades i les dades que hi vulgui desar qui l'usa. status() decideix què
+cal fer amb un fitxer:
+    new       no hi és al manifest
+    same      mida i mtime iguals (no es llegeix), o contingut igual (touch)
+    appended  ha crescut i el final del que ja es va processar no ha canviat
+    changed   qualsevol altre canvi: cal tornar-lo a processar sencer
+El hash és per segments (un per cada vegada que el fitxer ha crescut) més
+un hash dels últims EDGE_BYTES processats: detectar i registrar un afegit
+només llegeix aquest tros i la cua nova, no tot el prefix. Un canvi dins
+del prefix que no toqui aquest tros ni la mida passa per 'appended'; els
+fitxers d'aquest flux només creixen pel final.
+Les claus són rutes relatives al directori del manifest, de manera que
+l'arbre de dades es pot moure sencer.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Derivats dels scripts antics de reparació/normalització (no són entrades)
+DERIVED_SUFFIXES = (".fixed.jsonl", ".fixed2.jsonl", ".clean.jsonl")
+EDGE_BYTES = 64 << 10
+
+def primary_jsonl(folder) -> List[Path]:
+    """JSONL d'ingesta d'un directori, sense els derivats .fixed/.fixed2/.clean."""
+    return sorted(f for f in Path(folder).glob("*.jsonl") if not f.name.endswith(DERIVED_SUFFIXES))
+
+def file_hash(path, limit: Optional[int] = None, block: int = 1 << 20, start: int = 0) -> str:
+    """blake2b dels bytes [start, limit) (fins al final si limit és None), en streaming."""
+    h = hashlib.blake2b(digest_size=16)
+    left = None if limit is None else max(0, limit - start)
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while left is None or left > 0:
+            buf = fh.read(block if left is None else min(block, left))
+            if not buf:
+                break
+            h.update(buf)
+            if left is not None:
+                left -= len(buf)
+    return h.hexdigest()
+
+class Manifest:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as fh:
+                self.entries = json.load(fh).get("files", {})
+
+    def key(self, f) -> str:
+        return os.path.relpath(Path(f).resolve(), self.path.parent.resolve())
+
+    def get(self, f) -> Optional[Dict]:
+        return self.entries.get(self.key(f))
+
+    def status(self, f) -> str:
+        entry = self.get(f)
+        if entry is None:
+            return "new"
+        st = Path(f).stat()
+        size = entry["size"]
+        if st.st_size == size and st.st_mtime_ns == entry["mtime_ns"]:
+            return "same"
+        if st.st_size < size:
+            return "changed"
+        if st.st_size == size:
+            # mateixa mida i mtime nou: cal llegir-lo sencer per saber si és un touch
+            if not self._segments_match(f, entry):
+                return "changed"
+            entry["mtime_ns"] = st.st_mtime_ns
+            return "same"
+        if "edge" in entry:
+            if file_hash(f, size, start=max(0, size - EDGE_BYTES)) != entry["edge"]:
+                return "changed"
+        elif not self._segments_match(f, entry):   # entrada antiga, sense edge
+            return "changed"
+        return "appended"
+
+    @staticmethod
+    def _segments(entry: Dict) -> List[List]:
+        return entry.get("segments") or [[entry["size"], entry["hash"]]]
+
+    def _segments_match(self, f, entry: Dict) -> bool:
+        start = 0
+        for end, digest in self._segments(entry):
+            if file_hash(f, end, start=start) != digest:
+                return False
+            start = end
+        return True
+
+    def record(self, f, size: Optional[int] = None, outputs: Optional[List[str]] = None,
+               append: bool = False, **data) -> Dict:
+        """
+        Registra f com a processat fins al byte `size` (per defecte la mida
+        actual; si el fitxer creix mentre es processa, la resta surt com a
+        'appended' la propera vegada). append=True (després d'un status()
+        'appended'): només es llegeixen els bytes nous, com a segment nou.
+        """
+        st = Path(f).stat()
+        size = st.st_size if size is None else size
+        old = self.get(f)
+        if append and old is not None and old["size"] <= size:
+            segments = self._segments(old)
+            start = old["size"]
+        else:
+            segments, start = [], 0
+        if size > start or not segments:
+            segments = segments + [[size, file_hash(f, size, start=start)]]
+        digest = segments[0][1] if len(segments) == 1 else hashlib.blake2b(
+            "".join(d for _, d in segments).encode("ascii"), digest_size=16).hexdigest()
+        entry = {"hash": digest, "segments": segments, "size": size,
+                 "edge": file_hash(f, size, start=max(0, size - EDGE_BYTES)),
+                 "mtime_ns": st.st_mtime_ns if size == st.st_size else 0,
+                 "outputs": list(outputs or []), **data}
+        self.entries[self.key(f)] = entry
+        return entry
+
+    def forget(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    def missing(self) -> Iterator[str]:
+        """Claus de fitxers que ja no existeixen."""
+        base = self.path.parent
+        for key in list(self.entries):
+            if not (base / key).exists():
+                yield key
+
+    def save(self) -> None:
+        """Escriptura atòmica (via .tmp)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": 1, "files": self.entries}, fh, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -1,4 +1,5 @@
 ﻿# motor.py â€” TIQQUN PRO (decisor amb pot odds + SPR)
+import math
 from dataclasses import dataclass
 from typing import List, Literal, Optional
 from .logic import TechEval
@@ -18,6 +19,11 @@ class FusionOutput:
 
 DEFAULT_WEIGHTS = {'tech': 0.7, 'flow': 0.3}
 
+# Llindars del mode distribució (TechEval.ehs2 / hs_hist)
+STRONG_EHS2 = 0.64      # HS ~0.8 estable: valor robust, sizing gran
+VOLATILE_STD = 0.25     # força molt dependent del runout (projectes): sizing contingut
+BLUFFCATCH_STD = 0.10   # força estable i mitjana: bluff-catcher, no pujar
+
 # -------------------------
 # Funcions dâ€™ajuda
 # -------------------------
@@ -41,6 +47,28 @@ def suggest_sizing(spr: float, edge: float) -> float:
         return 66.0 if edge > 0.05 else 50.0
     return 50.0 if edge > 0.05 else 33.0
 
+def hs_std(tech: TechEval) -> Optional[float]:
+    """Desviació de la força entre runouts (None fora del mode distribució)."""
+    if tech.ehs2 is None:
+        return None
+    return math.sqrt(max(0.0, tech.ehs2 - tech.p_win * tech.p_win))
+
+def distribution_sizing(sizing: Optional[float], tech: TechEval) -> Optional[float]:
+    """Ajusta el sizing amb EHS²: més gran amb valor robust, menys amb mans volàtils."""
+    std = hs_std(tech)
+    if sizing is None or std is None:
+        return sizing
+    if tech.ehs2 >= STRONG_EHS2:
+        return max(sizing, 75.0)
+    if std >= VOLATILE_STD:
+        return min(sizing, 50.0)
+    return sizing
+
+def is_bluff_catcher(tech: TechEval) -> bool:
+    """Força mitjana i estable: guanya als farols però no a les mans de valor."""
+    std = hs_std(tech)
+    return std is not None and std <= BLUFFCATCH_STD and 0.30 <= tech.p_win < 0.65
+
 # -------------------------
 # Decisor nou (recomanat)
 # -------------------------
@@ -76,7 +104,7 @@ def decide_action(
     if to_call <= 1e-9:
         if conf >= 0.80 and tech.p_win >= 0.55:
             decision = 'RAISE'
-            sizing = suggest_sizing(spr, edge)
+            sizing = distribution_sizing(suggest_sizing(spr, edge), tech)
         else:
             decision = 'CALL'  # check/back
         return FusionOutput(conf, decision, tech, flow, _reasons(tech_conf, flow, tech, conf, beq, edge, spr), sizing, spr, beq)
@@ -113,6 +141,11 @@ def decide_action(
         else:
             decision = 'CALL'
 
+    # Amb distribució: un bluff-catcher paga però no puja (només el paguen mans millors)
+    if decision in ('RAISE', 'ALLIN') and is_bluff_catcher(tech):
+        decision, sizing = 'CALL', None
+    sizing = distribution_sizing(sizing, tech)
+
     return FusionOutput(conf, decision, tech, flow, _reasons(tech_conf, flow, tech, conf, beq, edge, spr), sizing, spr, beq)
 
 def _reasons(tech_conf: float, flow: float, tech: TechEval, conf: float, beq: float, edge: float, spr: float) -> List[str]:
@@ -127,7 +160,27 @@ def _reasons(tech_conf: float, flow: float, tech: TechEval, conf: float, beq: fl
         f"ev_hint={tech.ev_hint:.2f}",
         f"position={tech.position_score:.2f}",
         f"SPR={spr:.2f}",
-    ]
+    ] + _precision_reasons(tech) + _distribution_reasons(tech)
+
+def _precision_reasons(tech: TechEval) -> List[str]:
+    """Interval de confiança de p_win i trials (només en mode adaptatiu)."""
+    out: List[str] = []
+    if tech.p_win_ci is not None:
+        out.append(f"p_win_CI=[{tech.p_win_ci[0]:.3f},{tech.p_win_ci[1]:.3f}]")
+    if tech.trials is not None:
+        out.append(f"trials={tech.trials}")
+    return out
+
+def _distribution_reasons(tech: TechEval) -> List[str]:
+    """EHS², dispersió i histograma de HS (només en mode distribució)."""
+    if tech.ehs2 is None:
+        return []
+    out = [f"EHS2={tech.ehs2:.3f}", f"HS_std={hs_std(tech):.3f}"]
+    if tech.hs_hist is not None:
+        out.append("HS_hist=[" + ",".join(f"{h:.2f}" for h in tech.hs_hist) + "]")
+    if is_bluff_catcher(tech):
+        out.append("bluff_catcher")
+    return out
 
 # -------------------------
 # Compatibilitat: versiÃ³ antiga
@@ -0,0 +1,103 @@
+# modules/parallel.py
+"""
+Backend multi-procés (opcional) per a l'equity Monte Carlo.
+
+Reparteix els trials entre un ProcessPoolExecutor persistent (es crea un sol
+cop i es reutilitza entre crides) amb fluxos RNG independents per worker, i
+suma els recomptes de wins/ties.
+"""
+from __future__ import annotations
+import atexit
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .equity import (
+    EXACT_BUDGET, _batch_counts, _batch_ok, _exact_counts, _mc_counts, _np_spot, _prepare, _weights, exact_work, np,
+)
+from .evaluator import warm_up
+
+# Per sota d'això per worker, no compensa el cost d'enviar feina al pool
+MIN_TRIALS_PER_WORKER = 2000
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def get_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Pool persistent; només es recrea si es demana una mida diferent."""
+    global _POOL, _POOL_WORKERS
+    workers = workers or default_workers()
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            # cada worker construeix les taules en arrencar, no a la primera avaluació
+            _POOL = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+            _POOL_WORKERS = workers
+        return _POOL
+
+def shutdown_pool() -> None:
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=True, cancel_futures=True)
+        _POOL, _POOL_WORKERS = None, 0
+
+atexit.register(shutdown_pool)
+
+def _shard_counts(hero_i: List[int], board_i: List[int], combos, deck: List[int], trials: int, seed,
+                  sampler=None) -> Tuple[int, int]:
+    """Treball d'un worker: `seed` és un SeedSequence (numpy) o una cadena."""
+    if _batch_ok(hero_i, board_i):
+        rng = np.random.default_rng(seed)
+        return _batch_counts(*_np_spot(hero_i, board_i, combos, deck, sampler), trials, 4096, rng)
+    return _mc_counts(hero_i, board_i, combos, deck, trials, random.Random(seed), sampler)
+
+def _seeds(n: int, seed: Optional[int]) -> list:
+    if np is not None:
+        return np.random.SeedSequence(seed).spawn(n)
+    base = seed if seed is not None else int.from_bytes(os.urandom(8), "little")
+    return [f"{base}-{i}" for i in range(n)]
+
+def estimate_equity_parallel(
+    hero_hole: List[str],
+    board: List[str],
+    villain_range: List[List[str]],
+    trials: int = 20000,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    exact_budget: Optional[int] = EXACT_BUDGET,
+) -> float:
+    """
+    Mateixa interfície que estimate_equity, repartint els trials entre
+    processos. Spots petits (enumeració exacta o pocs trials) es resolen al
+    procés actual.
+    """
+    hero_i, board_i, combos, deck, sampler = _prepare(hero_hole, board, villain_range)
+    if exact_budget and exact_work(len(board_i), len(combos), len(deck)) <= exact_budget:
+        wins, ties, total = _exact_counts(hero_i, board_i, combos, deck, _weights(sampler))
+        return (wins + 0.5 * ties) / max(1, total)
+
+    workers = workers or default_workers()
+    shards = max(1, min(workers, trials // MIN_TRIALS_PER_WORKER))
+    seeds = _seeds(shards, seed)
+    if shards == 1:
+        wins, ties = _shard_counts(hero_i, board_i, combos, deck, trials, seeds[0], sampler)
+        return (wins + 0.5 * ties) / max(1, trials)
+
+    pool = get_pool(workers)
+    sizes = [trials // shards + (1 if i < trials % shards else 0) for i in range(shards)]
+    futs = [pool.submit(_shard_counts, hero_i, board_i, combos, deck, k, sd, sampler)
+            for k, sd in zip(sizes, seeds)]
+    wins = ties = 0
+    for f in futs:
+        w, t = f.result()
+        wins += w
+        ties += t
+    return (wins + 0.5 * ties) / max(1, trials)
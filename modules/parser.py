@@ -1,63 +1,91 @@
 ﻿# parser.py — TIQQUN PRO (versió amb activestatus check)
 import re, json
-from typing import Optional
-from .logic import tech_eval
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+from .logic import TechEval, tech_eval
 from .simbolic import flow_score
-from .motor import decide_action  # usem el decisor PRO (pot odds + SPR)
-
-# Estat de sessió
-STATE = {
-    'players': 6,
-    'bb': 1.0,
-    'hero_cards': [],
-    'board': [],
-    'street': 'preflop',
-    'pot': 0.0,
-    'to_call_hero': 0.0,
-    'hero_seat': 3,
-    'stack_effective': 100.0,   # en Big Blinds (BB). Per defecte: 100bb
-    'players_in_hand': {},      # s'omplirà a NEW()
-}
-
-def _init_players_in_hand(n):
-    # inicialitza el map de jugadors en mà (1..n) a True
-    STATE['players_in_hand'] = {i: True for i in range(1, n+1)}
-
-def _ref_line() -> str:
-    return (
-        f"REF players={STATE['players']} bb={STATE['bb']} street={STATE['street']} "
-        f"pot={STATE['pot']} to_call={STATE['to_call_hero']} "
-        f"stackBB={STATE['stack_effective']} hero={STATE['hero_cards']} board={STATE['board']}"
-    )
+from .motor import FusionOutput, decide_action  # usem el decisor PRO (pot odds + SPR)
+
+def new_state() -> dict:
+    """Estat inicial d'una taula."""
+    return {
+        'players': 6,
+        'bb': 1.0,
+        'hero_cards': [],
+        'board': [],
+        'street': 'preflop',
+        'pot': 0.0,
+        'to_call_hero': 0.0,
+        'hero_seat': 3,
+        'stack_effective': 100.0,   # en Big Blinds (BB). Per defecte: 100bb
+        'players_in_hand': {},      # s'omplirà a NEW()
+    }
+
+class EvalSpot(NamedTuple):
+    """Foto immutable del que cal per avaluar: es pot enviar a un worker."""
+    hero_cards: Tuple[str, ...]
+    board: Tuple[str, ...]
+    street: str
+    players: int
+    pot: float
+    to_call: float
+    hero_seat: int
+    bb: float
+    stack_effective: float
+    opponents: int
+    prior: Optional[TechEval] = None   # avaluació anterior del mateix spot d'equity
+    deadline_ms: Optional[float] = None  # pressupost de temps per a l'equity (None: fins convergir)
+
+def equity_key(spot: EvalSpot) -> tuple:
+    """Allò de què depèn l'equity: cartes, tauler, rang rival i rivals actius (no el pot)."""
+    return (spot.hero_cards, spot.board, "CO", "open", spot.opponents)
 
-def _run_eval() -> str:
-    # 1) Avaluacions base (trials reduïts per a interactivitat)
+def spot_spr(pot: float, bb: float, stack_effective: float) -> float:
+    """SPR: stack efectiu (en BB) passat a xips, sobre el pot (o 1 BB si el pot és 0)."""
+    denom = pot if pot > 0 else max(bb, 1e-9)
+    return stack_effective * bb / denom
+
+def decide(spot: EvalSpot) -> Tuple[FusionOutput, float]:
+    """
+    Avaluació pura d'un spot (sense estat compartit): (decisió, SPR).
+    Si el spot porta `prior`, l'equity i els draws es reutilitzen i només es
+    refan pot odds, EV i decisió. Amb deadline_ms, l'equity és la millor
+    estimació dins del pressupost; la següent avaluació del mateix spot la
+    continua refinant a partir del prior.
+    """
+    # 1) Avaluacions base (Monte Carlo adaptatiu: s'atura quan la decisió és clara)
     tech = tech_eval(
-        STATE['hero_cards'],
-        STATE['board'],
-        STATE['players'],
-        STATE['pot'],
-        STATE['to_call_hero'],
-        STATE['hero_seat'],
-        trials=5000
+        list(spot.hero_cards),
+        list(spot.board),
+        spot.players,
+        spot.pot,
+        spot.to_call,
+        spot.hero_seat,
+        trials=20000,
+        adaptive=True,
+        opponents=spot.opponents,
+        prior=spot.prior,
+        deadline_ms=spot.deadline_ms,
     )
-    flow = flow_score(STATE['hero_cards'], STATE['street'], STATE['board'])
+    flow = flow_score(list(spot.hero_cards), spot.street, list(spot.board))
 
     # 2) SPR (Stack-to-Pot Ratio)
-    stack_chips = STATE.get('stack_effective', 100.0) * STATE['bb']  # BB → xip
-    denom = STATE['pot'] if STATE['pot'] > 0 else max(STATE['bb'], 1e-9)
-    spr = stack_chips / denom
+    spr = spot_spr(spot.pot, spot.bb, spot.stack_effective)
 
     # 3) Decisió PRO (pot odds + SPR + fusió tech/flow)
-    out = decide_action(tech, flow, STATE['pot'], STATE['to_call_hero'], spr)
+    return decide_action(tech, flow, spot.pot, spot.to_call, spr), spr
 
-    # 4) Missatge resum
+def format_recommendation(out: FusionOutput, spr: float) -> str:
     sizing_txt = f" sizing={out.sizing:.0f}%pot" if out.sizing is not None else ""
     return (
         f"RECOM {out.decision}{sizing_txt} conf={out.conf_final:.2f} (SPR={spr:.2f}) | "
         + "; ".join(out.reasons)
     )
 
+def evaluate(spot: EvalSpot) -> str:
+    """Avaluació d'un spot com a línia RECOM del protocol."""
+    return format_recommendation(*decide(spot))
+
 def _who_to_seat(who: str) -> Optional[int]:
     """
     Converteix 'pN' a int N, si possible. Si l'input és numèric retornem directament.
@@ -71,108 +99,180 @@ def _who_to_seat(who: str) -> Optional[int]:
         return int(who)
     return None
 
-def parse_line(line: str) -> Optional[str]:
-    line = line.strip()
-    if not line or line.startswith('#'):
-        return None
+class TableSession:
+    """
+    Una taula: posseeix el seu estat i interpreta les comandes (NEW, SEATS,
+    A, F, T, R, END). Un procés pot portar tantes sessions com taules.
+
+    step() només actualitza l'estat i, si cal avaluar, retorna un EvalSpot;
+    així l'avaluació (decide/evaluate) es pot despatxar a workers compartits
+    sense tocar l'estat. parse_line() fa les dues coses seguides.
+
+    Dins d'una mà, l'última avaluació per equity_key es guarda (remember) i
+    viatja amb el spot següent: una acció que només canvia pot/to_call no
+    torna a simular. NEW buida la cache.
+
+    deadline_ms: pressupost de latència per recomanació (None: sense límit).
+    """
+
+    def __init__(self, state: Optional[dict] = None, table_id: str = "",
+                 deadline_ms: Optional[float] = None):
+        self.state = state if state is not None else new_state()
+        self.table_id = table_id
+        self.deadline_ms = deadline_ms
+        self._lock = threading.Lock()
+        self._equity: Dict[tuple, TechEval] = {}
+
+    def parse_line(self, line: str) -> Optional[str]:
+        reply, spot = self.step(line)
+        if spot is None:
+            return reply
+        out, spr = decide(spot)
+        self.remember(spot, out.tech)
+        return format_recommendation(out, spr)
+
+    def remember(self, spot: EvalSpot, tech: TechEval) -> None:
+        """Guarda l'avaluació d'un spot per reutilitzar-ne l'equity."""
+        with self._lock:
+            self._equity[equity_key(spot)] = tech
+
+    def step(self, line: str) -> Tuple[Optional[str], Optional[EvalSpot]]:
+        """(resposta, None) o (None, spot a avaluar)."""
+        with self._lock:
+            return self._step(line)
 
-    # NEW T=6 BB=1.0 STACK=120 HERO=As Kd
-    if line.startswith('NEW'):
-        m = re.search(r'T=(\d+)', line)
-        if m:
-            STATE['players'] = int(m.group(1))
-        m = re.search(r'BB=([0-9.]+)', line)
-        if m:
-            STATE['bb'] = float(m.group(1))
-        m = re.search(r'STACK=([0-9.]+)', line)
-        if m:
-            STATE['stack_effective'] = float(m.group(1))
-        # HERO cards: format estrict: As, Kd, 7h etc.
-        m2 = re.search(r'HERO=([2-9TJQKA][cdhs])[,\s]+([2-9TJQKA][cdhs])', line)
-        if m2:
-            STATE['hero_cards'] = [m2.group(1), m2.group(2)]
-        else:
-            STATE['hero_cards'] = []
-
-        # reinicia tauler i estat
-        STATE['board'] = []
-        STATE['street'] = 'preflop'
-        STATE['pot'] = 0.0
-        STATE['to_call_hero'] = 0.0
-        # inicialitza qui està a la mà
-        _init_players_in_hand(STATE['players'])
-        return f"OK NEW T={STATE['players']} BB={STATE['bb']} STACK={STATE['stack_effective']} HERO={STATE['hero_cards']}"
-
-    # SEATS _ _ H _ _ _
-    if line.startswith('SEATS'):
-        parts = line.split()[1:]
-        try:
-            hero_idx = parts.index('H')
-            STATE['hero_seat'] = hero_idx + 1
-        except ValueError:
-            STATE['hero_seat'] = 3
-        return f"OK SEATS {parts} hero_seat={STATE['hero_seat']}"
-
-    # Tauler
-    if line.startswith('F '):
-        STATE['board'] = line.split()[1:4]
-        STATE['street'] = 'flop'
+    def spot(self) -> EvalSpot:
+        st = self.state
+        spot = EvalSpot(
+            tuple(st['hero_cards']), tuple(st['board']), st['street'], st['players'],
+            st['pot'], st['to_call_hero'], st['hero_seat'], st['bb'],
+            st.get('stack_effective', 100.0), self._active_opponents(),
+        )
+        return spot._replace(prior=self._equity.get(equity_key(spot)), deadline_ms=self.deadline_ms)
+
+    def _init_players_in_hand(self, n):
+        # inicialitza el map de jugadors en mà (1..n) a True
+        self.state['players_in_hand'] = {i: True for i in range(1, n+1)}
+
+    def _ref_line(self) -> str:
+        st = self.state
+        return (
+            f"REF players={st['players']} bb={st['bb']} street={st['street']} "
+            f"pot={st['pot']} to_call={st['to_call_hero']} "
+            f"stackBB={st['stack_effective']} hero={st['hero_cards']} board={st['board']}"
+        )
+
+    def _active_opponents(self) -> int:
+        # rivals encara a la mà (sense comptar l'heroi)
+        st = self.state
+        active = sum(1 for seat, on in st['players_in_hand'].items()
+                     if on and seat != st['hero_seat'])
+        return max(1, active)
+
+    def _eval_or_ref(self) -> Tuple[Optional[str], Optional[EvalSpot]]:
         # Només evalua si l'heroi encara està a la mà
-        if STATE['players_in_hand'].get(STATE['hero_seat'], True):
-            return _run_eval()
-        else:
-            return _ref_line()
-
-    if line.startswith('T '):
-        STATE['board'].append(line.split()[1])
-        STATE['street'] = 'turn'
-        if STATE['players_in_hand'].get(STATE['hero_seat'], True):
-            return _run_eval()
-        else:
-            return _ref_line()
-
-    if line.startswith('R '):
-        STATE['board'].append(line.split()[1])
-        STATE['street'] = 'river'
-        if STATE['players_in_hand'].get(STATE['hero_seat'], True):
-            return _run_eval()
-        else:
-            return _ref_line()
-
-    # Accions: A <who> <act> [amount]
-    # act: b=bet, r=raise, a=allin, c=call, f=fold
-    if line.startswith('A '):
-        try:
-            _, who, act, *rest = line.split()
-            amt = float(rest[0]) if rest else 0.0
-        except Exception:
-            return 'ERR A format'
-
-        seat = _who_to_seat(who)
-
-        if act in ('b', 'r', 'a'):
-            # puja el pot i potencialment el to_call per a l'heroi
-            STATE['pot'] += amt
-            STATE['to_call_hero'] = max(STATE['to_call_hero'], amt)
-        elif act == 'c':
-            # el call "igualaria" l'últim to_call
-            STATE['pot'] += STATE['to_call_hero']
+        if self.state['players_in_hand'].get(self.state['hero_seat'], True):
+            return None, self.spot()
+        return self._ref_line(), None
+
+    def _step(self, line: str) -> Tuple[Optional[str], Optional[EvalSpot]]:
+        STATE = self.state
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return None, None
+
+        # NEW T=6 BB=1.0 STACK=120 HERO=As Kd
+        if line.startswith('NEW'):
+            m = re.search(r'T=(\d+)', line)
+            if m:
+                STATE['players'] = int(m.group(1))
+            m = re.search(r'BB=([0-9.]+)', line)
+            if m:
+                STATE['bb'] = float(m.group(1))
+            m = re.search(r'STACK=([0-9.]+)', line)
+            if m:
+                STATE['stack_effective'] = float(m.group(1))
+            # HERO cards: format estrict: As, Kd, 7h etc.
+            m2 = re.search(r'HERO=([2-9TJQKA][cdhs])[,\s]+([2-9TJQKA][cdhs])', line)
+            if m2:
+                STATE['hero_cards'] = [m2.group(1), m2.group(2)]
+            else:
+                STATE['hero_cards'] = []
+
+            # reinicia tauler i estat
+            STATE['board'] = []
+            STATE['street'] = 'preflop'
+            STATE['pot'] = 0.0
             STATE['to_call_hero'] = 0.0
-        elif act == 'f':
-            # marca el jugador com fora de la mà
-            if seat:
-                STATE['players_in_hand'][seat] = False
-        else:
-            return 'ERR A act'
-
-        # Només fem l'eval si l'hero encara està a la mà
-        if STATE['players_in_hand'].get(STATE['hero_seat'], True):
-            return _run_eval()
-        else:
-            return _ref_line()
-
-    if line.startswith('END'):
-        st = json.dumps(STATE, ensure_ascii=False)
-        return f"END STATE {st}"
-
-    return "ERR cmd"
+            # inicialitza qui està a la mà
+            self._init_players_in_hand(STATE['players'])
+            self._equity.clear()
+            return f"OK NEW T={STATE['players']} BB={STATE['bb']} STACK={STATE['stack_effective']} HERO={STATE['hero_cards']}", None
+
+        # SEATS _ _ H _ _ _
+        if line.startswith('SEATS'):
+            parts = line.split()[1:]
+            try:
+                hero_idx = parts.index('H')
+                STATE['hero_seat'] = hero_idx + 1
+            except ValueError:
+                STATE['hero_seat'] = 3
+            return f"OK SEATS {parts} hero_seat={STATE['hero_seat']}", None
+
+        # Tauler
+        if line.startswith('F '):
+            STATE['board'] = line.split()[1:4]
+            STATE['street'] = 'flop'
+            return self._eval_or_ref()
+
+        if line.startswith('T '):
+            STATE['board'].append(line.split()[1])
+            STATE['street'] = 'turn'
+            return self._eval_or_ref()
+
+        if line.startswith('R '):
+            STATE['board'].append(line.split()[1])
+            STATE['street'] = 'river'
+            return self._eval_or_ref()
+
+        # Accions: A <who> <act> [amount]
+        # act: b=bet, r=raise, a=allin, c=call, f=fold
+        if line.startswith('A '):
+            try:
+                _, who, act, *rest = line.split()
+                amt = float(rest[0]) if rest else 0.0
+            except Exception:
+                return 'ERR A format', None
+
+            seat = _who_to_seat(who)
+
+            if act in ('b', 'r', 'a'):
+                # puja el pot i potencialment el to_call per a l'heroi
+                STATE['pot'] += amt
+                STATE['to_call_hero'] = max(STATE['to_call_hero'], amt)
+            elif act == 'c':
+                # el call "igualaria" l'últim to_call
+                STATE['pot'] += STATE['to_call_hero']
+                STATE['to_call_hero'] = 0.0
+            elif act == 'f':
+                # marca el jugador com fora de la mà
+                if seat:
+                    STATE['players_in_hand'][seat] = False
+            else:
+                return 'ERR A act', None
+
+            # Només fem l'eval si l'hero encara està a la mà
+            return self._eval_or_ref()
+
+        if line.startswith('END'):
+            st = json.dumps(STATE, ensure_ascii=False)
+            return f"END STATE {st}", None
+
+        return "ERR cmd", None
+
+# Sessió per defecte: STATE és el seu estat (les UIs hi escriuen directament)
+DEFAULT_SESSION = TableSession()
+STATE = DEFAULT_SESSION.state
+
+def parse_line(line: str) -> Optional[str]:
+    return DEFAULT_SESSION.parse_line(line)
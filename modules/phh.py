@@ -0,0 +1,276 @@
+# modules/phh.py
+"""
+Lector en streaming de PHH (Poker Hand History, format TOML-like).
+
+Cada mà és un bloc de línies 'clau = valor'. Els valors es tokenitzen
+directament a tipus Python (cadenes '..'/"..", enters, reals, true/false,
+llistes imbricades), també si una llista ocupa diverses línies; els
+comentaris '#' fora de cadenes s'ignoren. Separadors de mà: '# Game N',
+'HAND' i capçaleres de secció '[...]' (fitxers .phhs).
+
+iter_hands() llegeix línia a línia d'un iterable (fitxer, gzip...), de
+manera que la memòria és la d'una mà, no la del fitxer.
+"""
+from __future__ import annotations
+import gzip
+import io
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+_HAND_SEP = re.compile(r"^(?:#\s*Game\b|HAND\b|\[[^\]=]*\]\s*(?:#.*)?$)")
+_HARD_SEP = re.compile(r"^(?:#\s*Game\b|HAND\b)")   # talla també una llista sense tancar
+_KEY = re.compile(r"^([A-Za-z_][A-Za-z0-9_.-]*)\s*=\s*(.*)$", re.S)
+_NUMBER = re.compile(r"[+-]?(?:\d[\d_]*)(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?")
+_ESCAPES = {"b": "\b", "t": "\t", "n": "\n", "f": "\f", "r": "\r", '"': '"', "\\": "\\"}
+
+# Inici de mà a nivell de bytes, per tallar fitxers grans en trossos (chunk_ranges)
+_HAND_START = re.compile(rb"^\s*(?:#\s*Game\b|HAND\b)")
+_SECTION_START = re.compile(rb"^\s*\[[^\]=\r\n]*\]\s*$")
+
+class PHHSyntaxError(ValueError):
+    pass
+
+def is_phh(path: Path) -> bool:
+    """.phh, .phhs, i les seves versions .gz."""
+    suffixes = path.suffixes
+    if suffixes and suffixes[-1] == ".gz":
+        suffixes = suffixes[:-1]
+    return bool(suffixes) and suffixes[-1] in (".phh", ".phhs")
+
+def open_phh(path) -> io.TextIOBase:
+    """Flux de text d'un fitxer PHH (descomprimeix .gz al vol)."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8-sig", errors="replace")
+
+# ---------- Tokenitzador de valors ----------
+
+def _skip(text: str, pos: int) -> int:
+    """Salta espais, salts de línia i comentaris."""
+    n = len(text)
+    while pos < n:
+        ch = text[pos]
+        if ch in " \t\r\n":
+            pos += 1
+        elif ch == "#":
+            end = text.find("\n", pos)
+            pos = n if end < 0 else end + 1
+        else:
+            break
+    return pos
+
+def _string(text: str, pos: int) -> Tuple[str, int]:
+    quote = text[pos]
+    pos += 1
+    if quote == "'":  # literal: sense escapes
+        end = text.find("'", pos)
+        if end < 0:
+            raise PHHSyntaxError("cadena sense tancar")
+        return text[pos:end], end + 1
+    out: List[str] = []
+    n = len(text)
+    while pos < n:
+        ch = text[pos]
+        if ch == '"':
+            return "".join(out), pos + 1
+        if ch == "\\" and pos + 1 < n:
+            esc = text[pos + 1]
+            if esc in _ESCAPES:
+                out.append(_ESCAPES[esc])
+                pos += 2
+                continue
+            if esc in "uU":
+                width = 4 if esc == "u" else 8
+                try:
+                    out.append(chr(int(text[pos + 2:pos + 2 + width], 16)))
+                except ValueError:
+                    raise PHHSyntaxError(f"escape invàlid a la posició {pos}") from None
+                pos += 2 + width
+                continue
+            raise PHHSyntaxError(f"escape invàlid a la posició {pos}")
+        out.append(ch)
+        pos += 1
+    raise PHHSyntaxError("cadena sense tancar")
+
+def _value(text: str, pos: int):
+    if pos >= len(text):
+        raise PHHSyntaxError("falta el valor")
+    ch = text[pos]
+    if ch == "[":
+        items = []
+        pos = _skip(text, pos + 1)
+        while True:
+            if pos >= len(text):
+                raise PHHSyntaxError("llista sense tancar")
+            if text[pos] == "]":
+                return items, pos + 1
+            item, pos = _value(text, pos)
+            items.append(item)
+            pos = _skip(text, pos)
+            if pos < len(text) and text[pos] == ",":
+                pos = _skip(text, pos + 1)
+            elif pos < len(text) and text[pos] != "]":
+                raise PHHSyntaxError(f"s'esperava ',' o ']' a la posició {pos}")
+    if ch in "'\"":
+        return _string(text, pos)
+    if text.startswith("true", pos):
+        return True, pos + 4
+    if text.startswith("false", pos):
+        return False, pos + 5
+    m = _NUMBER.match(text, pos)
+    if m and m.end() > pos:
+        tok = m.group().replace("_", "")
+        return (float(tok) if any(c in tok for c in ".eE") else int(tok)), m.end()
+    raise PHHSyntaxError(f"valor no reconegut: {text[pos:pos + 20]!r}")
+
+def parse_value(text: str):
+    """Valor PHH (subconjunt TOML) a tipus Python."""
+    val, pos = _value(text, _skip(text, 0))
+    if _skip(text, pos) != len(text):
+        raise PHHSyntaxError(f"text sobrant després del valor: {text[pos:pos + 20]!r}")
+    return val
+
+_BRACKET_TOKENS = re.compile(r"'[^'\n]*'?|\"(?:\\.|[^\"\\\n])*\"?|#[^\n]*|[\[\]]")
+
+def _open_brackets(text: str) -> int:
+    """Profunditat de '[' oberts (fora de cadenes i comentaris) al final del text."""
+    if "'" not in text and '"' not in text and "#" not in text:
+        return text.count("[") - text.count("]")
+    depth = 0
+    for tok in _BRACKET_TOKENS.findall(text):
+        if tok == "[":
+            depth += 1
+        elif tok == "]":
+            depth -= 1
+    return depth
+
+# ---------- Mans ----------
+
+def iter_hands(lines: Iterable[str], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict]:
+    """
+    Mans (dicts de camps tipats) d'un flux de línies PHH. Un camp amb error
+    de sintaxi s'omet; si es passa `errors`, s'hi afegeix (línia, missatge).
+    """
+    hand: Dict = {}
+    pending: Optional[Tuple[str, List[str], int]] = None  # llista multilínia a mig llegir
+    for no, raw in enumerate(lines, 1):
+        if pending is not None:
+            key, parts, start = pending
+            if _HARD_SEP.match(raw.strip()) or _KEY.match(raw.strip()):
+                # la llista no es va tancar: error i la línia es tracta de nou
+                if errors is not None:
+                    errors.append((start, f"llista sense tancar a '{key}'"))
+                pending = None
+            else:
+                parts.append(raw)
+                text = "".join(parts)
+                if _open_brackets(text) > 0:
+                    continue
+                pending = None
+                _assign(hand, key, text, start, errors)
+                continue
+        line = raw.strip()
+        if not line:
+            continue
+        if _HAND_SEP.match(line):
+            if hand:
+                yield hand
+            hand = {}
+            continue
+        if line.startswith("#"):
+            continue
+        m = _KEY.match(line)
+        if not m:
+            if errors is not None:
+                errors.append((no, f"línia no reconeguda: {line[:40]!r}"))
+            continue
+        key, text = m.group(1), m.group(2)
+        if _open_brackets(text) > 0:
+            pending = (key, [text + "\n"], no)
+            continue
+        _assign(hand, key, text, no, errors)
+    if pending is not None and errors is not None:
+        errors.append((pending[2], f"llista sense tancar a '{pending[0]}'"))
+    if hand:
+        yield hand
+
+def _assign(hand: Dict, key: str, text: str, no: int, errors: Optional[List[Tuple[int, str]]]) -> None:
+    try:
+        hand[key] = parse_value(text)
+    except PHHSyntaxError as e:
+        if errors is not None:
+            errors.append((no, f"{key}: {e}"))
+
+def iter_file(path) -> Iterator[Dict]:
+    """Mans d'un fitxer .phh/.phhs(.gz), en streaming."""
+    with open_phh(path) as fh:
+        yield from iter_hands(fh)
+
+# ---------- Trossos per byte (ingesta en paral·lel) ----------
+
+def _starts(path: Path):
+    return (_HAND_START, _SECTION_START) if path.suffixes[-1:] == [".phhs"] else (_HAND_START,)
+
+def starts_hand(path, offset: int) -> bool:
+    """La primera línia no buida a partir d'offset (inici de línia) obre una mà?"""
+    path = Path(path)
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        for line in fh:
+            if line.strip():
+                return any(r.match(line) for r in _starts(path))
+    return False
+
+def chunk_ranges(path, chunk_bytes: int, start: int = 0, size: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Talla un fitxer PHH sense comprimir (des de `start` fins a `size`) en
+    rangs [inici, fi) d'uns chunk_bytes que comencen sempre a l'inici d'una
+    mà ('# Game', 'HAND' o, en .phhs, una capçalera '[...]'). Un .gz no es
+    pot tallar: un sol rang.
+    """
+    path = Path(path)
+    size = path.stat().st_size if size is None else size
+    if path.suffix == ".gz" or chunk_bytes <= 0 or size - start <= chunk_bytes:
+        return [(start, size)]
+    starts = _starts(path)
+    points = [start]
+    with open(path, "rb") as fh:
+        target = start + chunk_bytes
+        while target < size:
+            fh.seek(target)
+            at = target + len(fh.readline())  # fins a l'inici de la línia següent
+            while True:
+                line = fh.readline()
+                if not line:
+                    at = size
+                    break
+                if any(r.match(line) for r in starts):
+                    break
+                at += len(line)
+            if at >= size:
+                break
+            points.append(at)
+            target = at + chunk_bytes
+    points.append(size)
+    return list(zip(points, points[1:]))
+
+def iter_range_lines(path, start: int, end: int) -> Iterator[str]:
+    """Línies de text del rang de bytes [start, end) d'un fitxer (o tot un .gz)."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        with open_phh(path) as fh:
+            yield from fh
+        return
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        pos = start
+        for raw in fh:
+            if pos >= end:
+                break
+            pos += len(raw)
+            line = raw.decode("utf-8", errors="replace")
+            if pos == len(raw):  # primera línia del fitxer
+                line = line.lstrip("\ufeff")
+            yield line
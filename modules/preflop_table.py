@@ -0,0 +1,115 @@
+# modules/preflop_table.py
+"""
+Taula precalculada d'equity preflop: 169 mans canòniques x rangs de
+data/refs/preflop_ranges.json (posició/acció).
+
+Format binari (little endian):
+    b"TQPF" | u16 versió | u16 n_rangs | u32 mida capçalera | capçalera JSON
+    | n_rangs x 169 x u16 (equity * 65535)
+
+La capçalera guarda l'ordre de claus "POS/acció" i el hash dels rangs
+compilats amb els seus pesos (PreflopRanges.weights_digest); si els rangs o
+els pesos canvien, la taula es considera obsoleta i no s'usa.
+"""
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .evaluator import RANKS
+
+MAGIC = b"TQPF"
+VERSION = 1
+_HEAD = struct.Struct("<4sHHI")
+_SCALE = 65535
+
+# Ruta per defecte relativa al repositori; TIQQUN_PREFLOP_TABLE la sobreescriu
+DEFAULT_TABLE_PATH = Path(__file__).resolve().parents[1] / "data" / "refs" / "preflop_equity.bin"
+TABLE_ENV = "TIQQUN_PREFLOP_TABLE"
+
+def default_table_path() -> Path:
+    return Path(os.environ.get(TABLE_ENV) or DEFAULT_TABLE_PATH)
+
+# Graella 13x13: diagonal = parelles, a sobre = suited, a sota = offsuit
+HAND_CLASSES: List[str] = []
+for _a in range(12, -1, -1):
+    for _b in range(12, -1, -1):
+        if _a == _b:
+            HAND_CLASSES.append(RANKS[_a] * 2)
+        elif _a > _b:
+            HAND_CLASSES.append(RANKS[_a] + RANKS[_b] + "s")
+        else:
+            HAND_CLASSES.append(RANKS[_b] + RANKS[_a] + "o")
+
+def hand_class_index(hero: List[str]) -> int:
+    """Índex (0..168) de la mà canònica de dues cartes."""
+    ra, rb = RANKS.index(hero[0][0]), RANKS.index(hero[1][0])
+    hi, lo = max(ra, rb), min(ra, rb)
+    if hi == lo or hero[0][1] == hero[1][1]:
+        return (12 - hi) * 13 + (12 - lo)
+    return (12 - lo) * 13 + (12 - hi)
+
+def representative(hand_class: str) -> List[str]:
+    """Dues cartes concretes per a una mà canònica ('AKs' -> As Ks)."""
+    a, b = hand_class[0], hand_class[1]
+    if a == b:
+        return [a + "s", b + "h"]
+    return [a + "s", b + ("s" if hand_class[2] == "s" else "h")]
+
+class PreflopEquityTable:
+    """Taula mapejada a memòria; les consultes no carreguen el fitxer sencer."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._fh = open(self.path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, hlen = _HEAD.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path}: format de taula preflop desconegut")
+        header = json.loads(self._mm[_HEAD.size:_HEAD.size + hlen].decode("utf-8"))
+        self.ranges_digest: str = header.get("ranges_digest", "")
+        self.trials: int = header.get("trials", 0)
+        self.keys: Dict[str, int] = {k: i for i, k in enumerate(header["keys"])}
+        self._data = _HEAD.size + hlen
+        if len(self.keys) != n:
+            raise ValueError(f"{self.path}: capçalera inconsistent")
+
+    @classmethod
+    def open(cls, path: str) -> Optional["PreflopEquityTable"]:
+        """Obre la taula si existeix i és vàlida; altrament None."""
+        try:
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    def matches(self, ranges_digest: str) -> bool:
+        return bool(ranges_digest) and ranges_digest == self.ranges_digest
+
+    def lookup(self, hero: List[str], position: str, action: str = "open") -> Optional[float]:
+        ri = self.keys.get(f"{position}/{action}")
+        if ri is None or len(hero) != 2:
+            return None
+        off = self._data + 2 * (ri * len(HAND_CLASSES) + hand_class_index(hero))
+        return struct.unpack_from("<H", self._mm, off)[0] / _SCALE
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+def write_table(path: str, keys: List[str], rows: List[List[float]], ranges_digest: str, trials: int) -> None:
+    header = json.dumps({
+        "keys": keys, "hands": HAND_CLASSES,
+        "ranges_digest": ranges_digest, "trials": trials,
+    }).encode("utf-8")
+    body = bytearray(_HEAD.pack(MAGIC, VERSION, len(keys), len(header)))
+    body += header
+    for row in rows:
+        body += struct.pack(f"<{len(row)}H", *(round(max(0.0, min(1.0, e)) * _SCALE) for e in row))
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    tmp.write_bytes(bytes(body))
+    tmp.replace(out)
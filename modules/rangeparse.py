@@ -0,0 +1,114 @@
+# modules/rangeparse.py
+"""
+Gramàtica completa de rangs en notació estàndard, compilada a pesos per combo.
+
+Tokens separats per comes o espais, cadascun amb pes opcional ':w' (0..1):
+    TT        parella                  TT+      TT..AA
+    22-66     parelles de 22 a 66      AK       AKs + AKo
+    AKs, AKo  suited / offsuit         A2s+     A2s..AKs (kicker puja)
+    KTo-K8o   mateixa carta alta, kickers de T a 8
+    AsKs      combo concret            AKo:0.5  pes 0.5
+Un token repetit sobreescriu el pes anterior. El parseig es memoritza per
+cadena, de manera que fitxers de rangs grans es carreguen un sol cop.
+"""
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from .evaluator import ALL_CARDS, CARD_INDEX, COMBO_CARDS, RANKS, SUITS, combo_index
+
+_TOKEN = re.compile(
+    r"^(?P<body>[2-9TJQKA][cdhs][2-9TJQKA][cdhs]"
+    r"|[2-9TJQKA]{2}[so]?(?:\+|-[2-9TJQKA]{2}[so]?)?)"
+    r"(?::(?P<w>\d*\.?\d+))?$"
+)
+
+class RangeSyntaxError(ValueError):
+    pass
+
+def _pair_combos(r: int) -> List[Tuple[int, int]]:
+    cards = [r * 4 + s for s in range(4)]
+    return [(cards[i], cards[j]) for i in range(4) for j in range(i + 1, 4)]
+
+def _two_rank_combos(hi: int, lo: int, kind: str) -> List[Tuple[int, int]]:
+    out = []
+    for s1 in range(4):
+        for s2 in range(4):
+            if (kind == "s" and s1 != s2) or (kind == "o" and s1 == s2):
+                continue
+            out.append((hi * 4 + s1, lo * 4 + s2))
+    return out
+
+def _parse_body(body: str) -> List[Tuple[int, int]]:
+    if len(body) == 4 and body[1] in SUITS:  # combo concret
+        a, b = CARD_INDEX[body[:2]], CARD_INDEX[body[2:]]
+        if a == b:
+            raise RangeSyntaxError(f"combo amb carta repetida: {body}")
+        return [(a, b)]
+
+    if "-" in body:
+        lo_tok, hi_tok = body.split("-")
+        a1, b1, k1 = RANKS.index(lo_tok[0]), RANKS.index(lo_tok[1]), lo_tok[2:]
+        a2, b2, k2 = RANKS.index(hi_tok[0]), RANKS.index(hi_tok[1]), hi_tok[2:]
+        if k1 != k2:
+            raise RangeSyntaxError(f"tipus diferents a {body}")
+        out: List[Tuple[int, int]] = []
+        if a1 == b1 and a2 == b2:  # 22-66
+            for r in range(min(a1, a2), max(a1, a2) + 1):
+                out += _pair_combos(r)
+            return out
+        if a1 != a2:
+            raise RangeSyntaxError(f"la carta alta ha de coincidir a {body}")
+        hi = a1
+        for lo in range(min(b1, b2), max(b1, b2) + 1):
+            if lo >= hi:
+                raise RangeSyntaxError(f"kicker no vàlid a {body}")
+            out += _hand_kind(hi, lo, k1)
+        return out
+
+    plus = body.endswith("+")
+    core = body[:-1] if plus else body
+    a, b, kind = RANKS.index(core[0]), RANKS.index(core[1]), core[2:]
+    if a == b:
+        if kind:
+            raise RangeSyntaxError(f"una parella no pot ser s/o: {body}")
+        ranks = range(a, 13) if plus else [a]
+        return [c for r in ranks for c in _pair_combos(r)]
+    hi, lo = max(a, b), min(a, b)
+    kickers = range(lo, hi) if plus else [lo]
+    return [c for k in kickers for c in _hand_kind(hi, k, kind)]
+
+def _hand_kind(hi: int, lo: int, kind: str) -> List[Tuple[int, int]]:
+    if kind:
+        return _two_rank_combos(hi, lo, kind)
+    return _two_rank_combos(hi, lo, "s") + _two_rank_combos(hi, lo, "o")
+
+@lru_cache(maxsize=4096)
+def _parse_cached(text: str) -> Tuple[Tuple[int, float], ...]:
+    weights: Dict[int, float] = {}
+    for tok in re.split(r"[,\s]+", text.strip()):
+        if not tok:
+            continue
+        m = _TOKEN.match(tok)
+        if not m:
+            raise RangeSyntaxError(f"token de rang no reconegut: {tok!r}")
+        w = float(m.group("w")) if m.group("w") is not None else 1.0
+        if not 0.0 <= w <= 1.0:
+            raise RangeSyntaxError(f"pes fora de [0, 1]: {tok!r}")
+        for a, b in _parse_body(m.group("body")):
+            weights[combo_index(a, b)] = w
+    return tuple(sorted(weights.items()))
+
+def parse_range(text: str) -> Dict[int, float]:
+    """Rang en text -> {índex de combo (0..1325): pes}."""
+    return dict(_parse_cached(text))
+
+def range_combos(text: str) -> List[List[str]]:
+    """Combos amb pes > 0 en strings, carta alta primer (format d'expand_range)."""
+    out = []
+    for i, w in _parse_cached(text):
+        if w > 0:
+            a, b = COMBO_CARDS[i]  # a < b
+            out.append([ALL_CARDS[b], ALL_CARDS[a]])
+    return out
@@ -1,18 +1,284 @@
-
 # modules/ranges.py
+import hashlib
 import json
+import os
+import struct
+import threading
+from array import array
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from .equity import expand_range
+from .rangeparse import RangeSyntaxError, parse_range
+from .sampling import AliasSampler
+from .evaluator import (
+    ALL_CARDS, COMBO_CARDS, COMBO_CODE, COMBO_MASK, combo_index, encode_many, np,
+)
+
+N_COMBOS = len(COMBO_CARDS)  # 1326
+
+# Índex de combo sota les permutacions de pals que generen totes les altres
+# (una transposició i un cicle de 4), per comprovar si un rang és simètric.
+_SUIT_GENERATORS = ((1, 0, 2, 3), (1, 2, 3, 0))
+_PERMUTED: Optional[List[List[int]]] = None
+
+def _permuted_indices() -> List[List[int]]:
+    global _PERMUTED
+    if _PERMUTED is None:
+        _PERMUTED = [[combo_index((a & ~3) | perm[a & 3], (b & ~3) | perm[b & 3]) for a, b in COMBO_CARDS]
+                     for perm in _SUIT_GENERATORS]
+    return _PERMUTED
+
+# Rutes per defecte relatives al repositori (no al directori de treball);
+# TIQQUN_RANGES les sobreescriu sense tocar codi.
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_RANGES_PATH = REPO_ROOT / "data" / "refs" / "preflop_ranges.json"
+RANGES_ENV = "TIQQUN_RANGES"
+
+# Cache binària de rangs compilats (al costat del JSON):
+#     b"TQRC" | u16 versió | u16 n_rangs | u32 mida capçalera | capçalera JSON
+#     | n_rangs x 1326 x f64 natius (pesos)
+# La capçalera porta el hash del JSON; si no coincideix, es recompila.
+CACHE_MAGIC = b"TQRC"
+CACHE_VERSION = 1
+_CACHE_HEAD = struct.Struct("<4sHHI")
+
+def default_ranges_path() -> Path:
+    return Path(os.environ.get(RANGES_ENV) or DEFAULT_RANGES_PATH)
+
+class CompiledRange:
+    """
+    Rang compilat: array de 1326 pesos indexat per combo (evaluator.COMBO_CARDS).
+    El filtratge per cartes mortes és una sola operació sobre màscares de bits
+    (vectoritzada amb numpy si hi és) i es memoritza per a l'última màscara.
+    Iterar-lo dona combos [c1, c2] en strings, com els rangs en llista.
+    Si els pesos no són tots iguals, els motors d'equity sortegen els combos
+    proporcionalment al pes amb una taula d'àlies (live_sampler), que només es
+    refà quan canvien les cartes mortes.
+    suit_symmetric diu si el rang és igual sota qualsevol permutació de pals
+    (màscares com 'AKs', 'TT+'); un rang amb combos explícits ('AhAd') pot no
+    ser-ho, i llavors la cache canònica d'equity no s'hi pot aplicar.
+    """
+
+    def __init__(self, weights: array):
+        self.weights = weights
+        self.indices: List[int] = [i for i, w in enumerate(weights) if w > 0]
+        self.uniform = len({weights[i] for i in self.indices}) <= 1
+        self._np_idx = np.array(self.indices, dtype=np.int64) if np is not None else None
+        self._np_mask = (np.array([COMBO_MASK[i] for i in self.indices], dtype=np.int64)
+                         if np is not None else None)
+        self._live_key: Optional[int] = None
+        self._live: List[int] = []
+        self._sampler_key: Optional[int] = None
+        self._sampler: Optional[AliasSampler] = None
+        self._symmetric: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, text: str) -> "CompiledRange":
+        """Rang en notació estàndard amb pesos ('TT+, AKs, AQo:0.5')."""
+        w = array("d", bytes(8 * N_COMBOS))
+        for i, wt in parse_range(text).items():
+            w[i] = wt
+        return cls(w)
+
+    @classmethod
+    def from_weighted(cls, pairs: Iterable[Tuple[List[str], float]]) -> "CompiledRange":
+        """Rang a partir de parells (combo, pes), p.ex. derivats d'estadístiques."""
+        w = array("d", bytes(8 * N_COMBOS))
+        for c, wt in pairs:
+            a, b = encode_many(c)
+            w[combo_index(a, b)] = wt
+        return cls(w)
+
+    @classmethod
+    def from_combos(cls, combos: List[List[str]], weight: float = 1.0) -> "CompiledRange":
+        w = array("d", bytes(8 * N_COMBOS))
+        for c in combos:
+            a, b = encode_many(c)
+            w[combo_index(a, b)] = weight
+        return cls(w)
+
+    @property
+    def suit_symmetric(self) -> bool:
+        if self._symmetric is None:
+            w = self.weights
+            self._symmetric = all(w[i] == w[perm[i]] for perm in _permuted_indices() for i in self.indices)
+        return self._symmetric
+
+    def live(self, dead_mask: int) -> List[int]:
+        """Índexs de combos amb pes > 0 que no toquen cap carta morta."""
+        with self._lock:
+            if dead_mask != self._live_key:
+                if self._np_idx is not None:
+                    keep = (self._np_mask & dead_mask) == 0
+                    self._live = self._np_idx[keep].tolist()
+                else:
+                    self._live = [i for i in self.indices if not COMBO_MASK[i] & dead_mask]
+                self._live_key = dead_mask
+            return self._live
+
+    def live_entries(self, dead_mask: int) -> List[Tuple[int, int, int]]:
+        """(c1, c2, suma de codes) dels combos vius, format dels nuclis d'equity."""
+        return [COMBO_CARDS[i] + (COMBO_CODE[i],) for i in self.live(dead_mask)]
+
+    def live_weights(self, dead_mask: int) -> Optional[List[float]]:
+        """Pesos alineats amb live_entries; None si el rang és uniforme."""
+        if self.uniform:
+            return None
+        w = self.weights
+        return [w[i] for i in self.live(dead_mask)]
+
+    def live_sampler(self, dead_mask: int) -> Optional[AliasSampler]:
+        """
+        Taula d'àlies sobre live_entries (None si el rang és uniforme o no
+        queda cap combo viu), memoritzada per a l'última màscara de mortes.
+        """
+        if self.uniform:
+            return None
+        with self._lock:
+            if dead_mask == self._sampler_key:
+                return self._sampler
+        weights = self.live_weights(dead_mask)
+        sampler = AliasSampler(weights) if weights else None
+        with self._lock:
+            self._sampler, self._sampler_key = sampler, dead_mask
+        return sampler
+
+    def combos(self) -> List[List[str]]:
+        return [[ALL_CARDS[COMBO_CARDS[i][0]], ALL_CARDS[COMBO_CARDS[i][1]]] for i in self.indices]
+
+    def __iter__(self) -> Iterator[List[str]]:
+        return iter(self.combos())
+
+    def __len__(self) -> int:
+        return len(self.indices)
 
 class PreflopRanges:
-    def __init__(self, path: str = "data/refs/preflop_ranges.json"):
-        self.path = Path(path)
-        self.data = json.loads(self.path.read_text(encoding="utf-8"))
+    """
+    Rangs preflop per posició/acció. Si hi ha cache binària vàlida
+    (preflop_ranges.bin), els rangs compilats es carreguen d'allà sense
+    parsejar màscares; si no, es compilen i la cache s'escriu (si es pot).
+    missing_ok=True dona un conjunt buit quan el JSON no existeix (els motors
+    d'equity llavors sortegen un rival random).
+    """
+
+    def __init__(self, path: Optional[str] = None, missing_ok: bool = False, use_cache: bool = True):
+        self.path = Path(path) if path else default_ranges_path()
+        self.cache_path = self.path.with_suffix(".bin")
+        self._data: Optional[dict] = None
+        self._keys: Optional[List[str]] = None
+        self._combos: Dict[Tuple[str, str], List[List[str]]] = {}
+        self._compiled: Dict[Tuple[str, str], CompiledRange] = {}
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            if not missing_ok:
+                raise
+            self.digest = ""
+            self._data = {}
+            return
+        self.digest = hashlib.sha1(raw).hexdigest()
+        self._raw: Optional[bytes] = raw
+        if use_cache and not self._load_cache():
+            self._compile_all()
+            try:
+                self.save_cache()
+            except OSError:
+                pass  # directori de només lectura: seguim sense cache
+
+    @property
+    def data(self) -> dict:
+        """JSON de rangs, parsejat només si cal (la cache no el necessita)."""
+        if self._data is None:
+            self._data = json.loads(self._raw.decode("utf-8"))
+            self._raw = None
+        return self._data
+
+    @property
+    def available(self) -> bool:
+        return bool(self.digest)
+
+    @property
+    def weights_digest(self) -> str:
+        """
+        Hash dels rangs compilats (claus i pesos de cada combo), el que fan
+        servir els motors; la taula preflop s'hi valida. Buit sense JSON.
+        """
+        if not self.digest:
+            return ""
+        h = hashlib.sha1(self.digest.encode("ascii"))
+        for key in self.keys():
+            pos, act = key.split("/", 1)
+            h.update(key.encode("utf-8"))
+            h.update(self.compiled_for(pos, act).weights.tobytes())
+        return h.hexdigest()
+
+    def _compile_all(self) -> None:
+        for key in self.keys():
+            pos, act = key.split("/", 1)
+            self.compiled_for(pos, act)
+
+    def _load_cache(self) -> bool:
+        try:
+            buf = self.cache_path.read_bytes()
+            magic, version, n, hlen = _CACHE_HEAD.unpack_from(buf, 0)
+        except (OSError, struct.error):
+            return False
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            return False
+        header = json.loads(buf[_CACHE_HEAD.size:_CACHE_HEAD.size + hlen].decode("utf-8"))
+        keys = header.get("keys", [])
+        off = _CACHE_HEAD.size + hlen
+        if header.get("ranges_digest") != self.digest or len(keys) != n or len(buf) != off + 8 * N_COMBOS * n:
+            return False
+        for i, key in enumerate(keys):
+            w = array("d")
+            w.frombytes(buf[off + 8 * N_COMBOS * i:off + 8 * N_COMBOS * (i + 1)])
+            pos, act = key.split("/", 1)
+            self._compiled[(pos, act)] = CompiledRange(w)
+        self._keys = keys
+        return True
+
+    def save_cache(self, path: Optional[str] = None) -> None:
+        """Desa tots els rangs compilats a la cache binària."""
+        keys = self.keys()
+        header = json.dumps({"keys": keys, "ranges_digest": self.digest}).encode("utf-8")
+        body = bytearray(_CACHE_HEAD.pack(CACHE_MAGIC, CACHE_VERSION, len(keys), len(header)))
+        body += header
+        for key in keys:
+            pos, act = key.split("/", 1)
+            body += self.compiled_for(pos, act).weights.tobytes()
+        out = Path(path) if path else self.cache_path
+        tmp = out.with_suffix(out.suffix + ".tmp")
+        tmp.write_bytes(bytes(body))
+        tmp.replace(out)
+
+    def keys(self) -> List[str]:
+        """Claus 'POS/acció' de tots els rangs definits."""
+        if self._data is None and self._keys is not None:
+            return list(self._keys)
+        return [f"{pos}/{act}" for pos, acts in self.data.items() for act in acts]
 
     def combos_for(self, position: str, action: str = "open") -> List[List[str]]:
-        masks = self.data.get(position, {}).get(action, [])
-        combos = []
-        for m in masks:
-            combos += expand_range(m)
-        return combos
+        key = (position, action)
+        combos = self._combos.get(key)
+        if combos is None:
+            masks = self.data.get(position, {}).get(action, [])
+            combos = []
+            for m in masks:
+                combos += expand_range(m)
+            self._combos[key] = combos
+        return [list(c) for c in combos]
+
+    def compiled_for(self, position: str, action: str = "open") -> CompiledRange:
+        """Rang compilat amb pesos ('AQo:0.5'), memoritzat per posició/acció."""
+        key = (position, action)
+        cr = self._compiled.get(key)
+        if cr is None:
+            masks = self.data.get(position, {}).get(action, [])
+            try:
+                cr = CompiledRange.from_text(", ".join(masks))
+            except RangeSyntaxError:  # màscares no vàlides: ignora-les una a una
+                cr = CompiledRange.from_combos(self.combos_for(position, action))
+            self._compiled[key] = cr
+        return cr
@@ -0,0 +1,176 @@
+# modules/replay.py
+"""
+Reproducció massiva de mans pel motor: fitxers de comandes del protocol
+(NEW/SEATS/A/F/T/R/END) o mans PHH convertides a comandes.
+
+Cada feina (un fitxer de comandes, o una mà PHH vista des d'un seient) es
+reprodueix en una TableSession pròpia dins d'un procés worker i retorna un
+registre estructurat per recomanació, amb la latència de l'avaluació.
+"""
+from __future__ import annotations
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from .parser import TableSession, decide
+from .phh import PHHSyntaxError, is_phh, iter_file, iter_hands, parse_value
+
+_CARD_PAIR = re.compile(r"^([2-9TJQKA][cdhs])([2-9TJQKA][cdhs])$")
+
+class ReplayJob(NamedTuple):
+    source: str          # fitxer d'origen
+    hand: int            # índex de mà dins del fitxer (0 per a fitxers de comandes)
+    hero_seat: int       # seient de l'heroi (0 si ho decideix el fitxer de comandes)
+    lines: List[str]     # comandes del protocol
+
+# ---------- PHH -> comandes ----------
+
+def _phh_value(text: str):
+    """Valor d'una assignació PHH; si no és sintaxi vàlida, el text tal qual."""
+    try:
+        return parse_value(text)
+    except PHHSyntaxError:
+        return text.strip().strip("'\"")
+
+def parse_phh_text(text: str) -> Iterator[Dict]:
+    """Mans d'un text PHH (vegeu modules.phh)."""
+    return iter_hands(text.splitlines(True))
+
+def _hand_from_json(obj: Dict) -> Dict:
+    """Mà en els formats de data/interim/phh_parsed (camps directes, 'events' o 'raw')."""
+    if "actions" in obj and isinstance(obj["actions"], list):
+        hand = dict(obj)
+        for ev in obj.get("events", []):  # blinds/stacks només hi són com a text
+            if isinstance(ev, str) and "=" in ev:
+                k, _, v = ev.partition("=")
+                hand.setdefault(k.strip(), _phh_value(v.strip()))
+        return hand
+    if "events" in obj:
+        return next(parse_phh_text("\n".join(obj["events"])), {})
+    if "raw" in obj:
+        return next(parse_phh_text(obj["raw"]), {})
+    return {}
+
+def hole_cards(hand: Dict) -> Dict[int, List[str]]:
+    """Cartes conegudes per seient (1..n) a partir de les accions 'd dh'."""
+    out: Dict[int, List[str]] = {}
+    for act in hand.get("actions", []):
+        parts = act.split()
+        if len(parts) >= 4 and parts[0] == "d" and parts[1] == "dh":
+            m = _CARD_PAIR.match(parts[3])
+            if m:
+                out[int(parts[2][1:])] = [m.group(1), m.group(2)]
+    return out
+
+def phh_to_commands(hand: Dict, hero_seat: int) -> List[str]:
+    """Converteix una mà PHH a comandes del protocol des del seient hero_seat."""
+    cards = hole_cards(hand).get(hero_seat)
+    if not cards:
+        return []
+    stacks = hand.get("starting_stacks") or []
+    n = len(stacks) or len(hand.get("players") or []) or 6
+    bb = float(max(hand.get("blinds_or_straddles") or [1]) or 1)
+    stack_bb = (stacks[hero_seat - 1] / bb) if len(stacks) >= hero_seat else 100.0
+    seats = ["H" if i == hero_seat else "_" for i in range(1, n + 1)]
+    lines = [f"NEW T={n} BB={bb:g} STACK={stack_bb:g} HERO={cards[0]} {cards[1]}", "SEATS " + " ".join(seats)]
+    n_board = 0
+    for act in hand.get("actions", []):
+        parts = act.split()
+        if len(parts) < 2:
+            continue
+        if parts[0] == "d":
+            if parts[1] == "db" and len(parts) >= 3:
+                board = [parts[2][i:i + 2] for i in range(0, len(parts[2]), 2)]
+                if n_board == 0 and len(board) >= 3:
+                    lines.append("F " + " ".join(board[:3]))
+                    extra = board[3:]
+                    n_board = 3
+                else:
+                    extra = board
+                for c in extra:
+                    lines.append(("T " if n_board == 3 else "R ") + c)
+                    n_board += 1
+            continue
+        who, verb = parts[0], parts[1]
+        if verb == "f":
+            lines.append(f"A {who} f")
+        elif verb == "cc":
+            lines.append(f"A {who} c")
+        elif verb == "cbr" and len(parts) >= 3:
+            lines.append(f"A {who} r {parts[2]}")
+    lines.append("END")
+    return lines
+
+# ---------- Feines ----------
+
+def _phh_hands(path: Path) -> Iterator[Dict]:
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8-sig") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    try:
+                        yield _hand_from_json(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    else:
+        yield from iter_file(path)
+
+def iter_jobs(paths: List[str], hero: Optional[str] = None) -> Iterator[ReplayJob]:
+    """
+    Feines a partir de fitxers o directoris. .phh/.phhs(.gz)/.jsonl són mans PHH
+    (una feina per seient amb cartes conegudes, o només el seient `hero`:
+    'pN' o nom de jugador); qualsevol altre fitxer és un fitxer de comandes.
+    """
+    for p in paths:
+        path = Path(p)
+        files = sorted(f for f in path.rglob("*") if f.is_file()) if path.is_dir() else [path]
+        for f in files:
+            if is_phh(f) or f.suffix == ".jsonl":
+                for i, hand in enumerate(_phh_hands(f)):
+                    for seat in _hero_seats(hand, hero):
+                        lines = phh_to_commands(hand, seat)
+                        if lines:
+                            yield ReplayJob(str(f), i, seat, lines)
+            else:
+                with open(f, "r", encoding="utf-8-sig") as fh:
+                    yield ReplayJob(str(f), 0, 0, [ln.strip() for ln in fh])
+
+def _hero_seats(hand: Dict, hero: Optional[str]) -> List[int]:
+    seats = sorted(hole_cards(hand))
+    if not hero:
+        return seats
+    if re.fullmatch(r"p\d+", hero):
+        return [s for s in seats if s == int(hero[1:])]
+    players = hand.get("players") or []
+    return [s for s in seats if s <= len(players) and players[s - 1] == hero]
+
+def run_job(job: ReplayJob, deadline_ms: Optional[float] = None) -> List[Dict]:
+    """Reprodueix una feina en una sessió nova; un registre per recomanació."""
+    session = TableSession(table_id=f"{job.source}#{job.hand}", deadline_ms=deadline_ms)
+    records = []
+    for no, line in enumerate(job.lines, 1):
+        reply, spot = session.step(line)
+        if spot is None:
+            continue
+        t0 = time.perf_counter()
+        try:
+            out, spr = decide(spot)
+        except Exception as e:  # mateix criteri que la CLI: l'error va al registre
+            records.append({"source": job.source, "hand": job.hand, "line": no, "command": line,
+                            "street": spot.street, "error": f"{type(e).__name__}: {e}"})
+            continue
+        ms = 1000.0 * (time.perf_counter() - t0)
+        session.remember(spot, out.tech)
+        records.append({
+            "source": job.source, "hand": job.hand, "hero_seat": job.hero_seat, "line": no,
+            "command": line, "street": spot.street,
+            "hero": list(spot.hero_cards), "board": list(spot.board),
+            "pot": spot.pot, "to_call": spot.to_call, "opponents": spot.opponents,
+            "decision": out.decision, "sizing": out.sizing, "conf": round(out.conf_final, 4),
+            "p_win": round(out.tech.p_win, 4), "trials": out.tech.trials,
+            "reused": spot.prior is not None, "spr": round(spr, 3), "latency_ms": round(ms, 3),
+        })
+    return records
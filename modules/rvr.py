@@ -0,0 +1,152 @@
+# modules/rvr.py
+"""
+Equity rang contra rang: cada combo del rang A contra tot el rang B sobre un
+board, amb bloquejos (combo-combo i combo-runout) gestionats.
+
+Per a cada runout s'avalua cada combo un sol cop (A+B avaluacions) i després
+es comparen tots els parells vàlids: amb numpy, per broadcasting; sense,
+amb cerca binària sobre els valors de B ordenats.
+"""
+from __future__ import annotations
+import itertools
+import math
+import random
+from bisect import bisect_left, bisect_right
+from typing import List, NamedTuple, Optional, Sequence
+
+from .equity import _combo_entry, expand_range
+from .evaluator import CARD_CODE, encode_many, np, value_from_code
+
+class RangeEquity(NamedTuple):
+    combos: List[List[str]]   # combos de A no bloquejats pel board
+    equities: List[float]     # equity de cada combo de A contra el rang B
+    aggregate: float          # equity del rang A contra el rang B
+    runouts: int              # runouts avaluats
+    exact: bool               # True si s'han enumerat tots els runouts
+
+def range_vs_range(
+    range_a: List[List[str]],
+    range_b: List[List[str]],
+    board: Sequence[str] = (),
+    max_runouts: int = 2000,
+    seed: Optional[int] = None,
+) -> RangeEquity:
+    """
+    Equity de cada combo de range_a contra range_b. Si el nombre de runouts
+    possibles és <= max_runouts s'enumeren tots (resultat exacte); si no,
+    se'n mostregen max_runouts.
+    """
+    board_i = encode_many(board)
+    dead = 0
+    for c in board_i:
+        dead |= 1 << c
+    A = [(c, _combo_entry(c)) for c in range_a if not _mask(c) & dead]
+    B = [_combo_entry(c) for c in range_b if not _mask(c) & dead]
+    combos_a = [c for c, _ in A]
+    ea = [e for _, e in A]
+    if not ea or not B:
+        return RangeEquity(combos_a, [0.0] * len(ea), 0.0, 0, True)
+
+    deck = [ci for ci in range(52) if not (dead >> ci) & 1]
+    need = 5 - len(board_i)
+    total_runouts = math.comb(len(deck), need)
+    if total_runouts <= max_runouts:
+        runouts = itertools.combinations(deck, need)
+        n_runouts, exact = total_runouts, True
+    else:
+        rng = random.Random(seed)
+        runouts = (rng.sample(deck, need) for _ in range(max_runouts))
+        n_runouts, exact = max_runouts, False
+
+    mask_a = [(1 << a) | (1 << b) for a, b, _ in ea]
+    mask_b = [(1 << a) | (1 << b) for a, b, _ in B]
+    board_k = sum(CARD_CODE[c] for c in board_i)
+    acc = _NumpyAcc(mask_a, mask_b) if np is not None else _BisectAcc(mask_a, mask_b)
+
+    for run in runouts:
+        run = list(run)
+        run_mask = 0
+        rk = board_k
+        for c in run:
+            run_mask |= 1 << c
+            rk += CARD_CODE[c]
+        full = board_i + run
+        va = [value_from_code(rk + k, full + [a, b]) if not m & run_mask else -1
+              for (a, b, k), m in zip(ea, mask_a)]
+        vb = [value_from_code(rk + k, full + [a, b]) if not m & run_mask else -1
+              for (a, b, k), m in zip(B, mask_b)]
+        acc.add(va, vb)
+
+    score, matchups = acc.result()
+    equities = [s / m if m else 0.0 for s, m in zip(score, matchups)]
+    aggregate = sum(score) / max(1, sum(matchups))
+    return RangeEquity(combos_a, equities, aggregate, n_runouts, exact)
+
+def range_vs_range_masks(masks_a: List[str], masks_b: List[str], board: Sequence[str] = (), **kw) -> RangeEquity:
+    """Com range_vs_range però a partir de màscares ('AKs', 'TT', ...)."""
+    ra = [c for m in masks_a for c in expand_range(m)]
+    rb = [c for m in masks_b for c in expand_range(m)]
+    return range_vs_range(ra, rb, board, **kw)
+
+def range_vs_range_for(ranges, pos_a: str, act_a: str, pos_b: str, act_b: str,
+                       board: Sequence[str] = (), **kw) -> RangeEquity:
+    """Rang de PreflopRanges (posició/acció) contra un altre."""
+    return range_vs_range(ranges.combos_for(pos_a, act_a), ranges.combos_for(pos_b, act_b), board, **kw)
+
+def _mask(combo: List[str]) -> int:
+    m = 0
+    for c in encode_many(combo):
+        m |= 1 << c
+    return m
+
+class _NumpyAcc:
+    """Acumula wins+ties/2 i matchups per combo de A amb broadcasting."""
+
+    def __init__(self, mask_a: List[int], mask_b: List[int]):
+        ma = np.array(mask_a, dtype=np.int64)[:, None]
+        mb = np.array(mask_b, dtype=np.int64)[None, :]
+        self.compatible = (ma & mb) == 0
+        self.score = np.zeros(len(mask_a))
+        self.matchups = np.zeros(len(mask_a))
+
+    def add(self, va: List[int], vb: List[int]) -> None:
+        a = np.array(va, dtype=np.int64)[:, None]
+        b = np.array(vb, dtype=np.int64)[None, :]
+        ok = self.compatible & (a >= 0) & (b >= 0)
+        self.score += ((a > b) & ok).sum(axis=1) + 0.5 * ((a == b) & ok).sum(axis=1)
+        self.matchups += ok.sum(axis=1)
+
+    def result(self):
+        return self.score.tolist(), self.matchups.tolist()
+
+class _BisectAcc:
+    """Mateix acumulador en Python pur: cerca binària + correcció per bloquejos."""
+
+    def __init__(self, mask_a: List[int], mask_b: List[int]):
+        self.conflicts = [[j for j, mb in enumerate(mask_b) if ma & mb] for ma in mask_a]
+        self.score = [0.0] * len(mask_a)
+        self.matchups = [0] * len(mask_a)
+
+    def add(self, va: List[int], vb: List[int]) -> None:
+        sorted_b = sorted(v for v in vb if v >= 0)
+        n_b = len(sorted_b)
+        for i, v in enumerate(va):
+            if v < 0:
+                continue
+            lo = bisect_left(sorted_b, v)
+            hi = bisect_right(sorted_b, v)
+            wins, ties, n = lo, hi - lo, n_b
+            for j in self.conflicts[i]:
+                w = vb[j]
+                if w < 0:
+                    continue
+                n -= 1
+                if w < v:
+                    wins -= 1
+                elif w == v:
+                    ties -= 1
+            self.score[i] += wins + 0.5 * ties
+            self.matchups[i] += n
+
+    def result(self):
+        return self.score, self.matchups
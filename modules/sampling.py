@@ -0,0 +1,61 @@
+# modules/sampling.py
+"""
+Sorteig ponderat en O(1) amb el mètode d'àlies (Walker/Vose).
+
+La taula es construeix un cop en O(n) i després cada sorteig costa una sola
+variable uniforme: u*n dona la columna i la part fraccionària decideix entre
+la columna i el seu àlies. draw_np fa el mateix per a un lot sencer.
+"""
+from __future__ import annotations
+from typing import List, Sequence
+
+from .evaluator import np
+
+class AliasSampler:
+    """Índexs 0..n-1 amb probabilitat proporcional a `weights` (tots > 0)."""
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("AliasSampler necessita almenys un pes")
+        total = float(sum(weights))
+        prob = [w * n / total for w in weights]
+        alias = list(range(n))
+        small = [i for i, p in enumerate(prob) if p < 1.0]
+        large = [i for i, p in enumerate(prob) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            alias[s] = l
+            prob[l] -= 1.0 - prob[s]
+            (small if prob[l] < 1.0 else large).append(l)
+        for i in small + large:  # residus per arrodoniment
+            prob[i] = 1.0
+        self.n = n
+        self.weights: List[float] = list(weights)
+        self.prob = prob
+        self.alias = alias
+        self._np = None
+
+    def draw(self, rand) -> int:
+        """Un índex; rand és una funció que retorna floats uniformes a [0, 1)."""
+        u = rand() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def draw_np(self, rng, size: int):
+        """Lot de `size` índexs amb un Generator de numpy."""
+        if self._np is None:
+            self._np = (np.array(self.prob), np.array(self.alias, dtype=np.int64))
+        prob, alias = self._np
+        u = rng.random(size) * self.n
+        i = u.astype(np.int64)
+        return np.where(u - i < prob[i], i, alias[i])
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getstate__(self):  # els arrays de numpy es refan al procés destí
+        state = self.__dict__.copy()
+        state["_np"] = None
+        return state
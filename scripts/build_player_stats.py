@@ -1,22 +1,58 @@
-
 # scripts/build_player_stats.py
+"""
+Mans per heroi a partir dels JSONL d'ingesta.
+
+Incremental com calc_stats_from_actions.py: els comptadors de cada fitxer es
+guarden al manifest (data/processed/hero_stats_manifest.json); només es
+llegeixen els fitxers nous o canviats, i dels que han crescut només la cua.
+"""
 import json
+import sys
 from pathlib import Path
-from collections import defaultdict
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.manifest import Manifest, primary_jsonl
 
 SRC = Path("data/interim/phh_parsed")
 DST = Path("data/processed")
 DST.mkdir(parents=True, exist_ok=True)
+MANIFEST = DST / 'hero_stats_manifest.json'
+
+def iter_lines(f, start=0):
+    """Objectes JSON de f des del byte start (una mà per línia)."""
+    with open(f, 'rb') as fh:
+        fh.seek(start)
+        for raw in fh:
+            line = raw.decode('utf-8', errors='replace').lstrip('﻿').strip()
+            if line:
+                yield json.loads(line)
 
-stats = defaultdict(lambda: {'hands': 0, 'vpip': 0, 'pfr': 0, 'threebet': 0})
+manifest = Manifest(MANIFEST)
+for key in list(manifest.missing()):
+    manifest.forget(key)
 
-for f in SRC.glob("*.jsonl"):
-    with open(f, 'r', encoding='utf-8') as r:
-        for line in r:
-            obj = json.loads(line)
+stats = {}
+for f in primary_jsonl(SRC):
+    status = manifest.status(f)
+    entry = manifest.get(f)
+    if status == 'same':
+        file_stats = entry['stats']
+    else:
+        start = entry['size'] if status == 'appended' else 0
+        file_stats = entry['stats'] if status == 'appended' else {}
+        size = f.stat().st_size
+        for obj in iter_lines(f, start):
             pid = obj.get('hero', 'unknown')
-            s = stats[pid]
+            s = file_stats.setdefault(pid, {'hands': 0, 'vpip': 0, 'pfr': 0, 'threebet': 0})
             s['hands'] += 1
+        manifest.record(f, size=size, append=(status == 'appended'), stats=file_stats)
+    for pid, d in file_stats.items():
+        s = stats.setdefault(pid, {'hands': 0, 'vpip': 0, 'pfr': 0, 'threebet': 0})
+        for k, v in d.items():
+            s[k] += v
+manifest.save()
 
 with open(DST / 'player_stats.json', 'w', encoding='utf-8') as w:
     json.dump(stats, w, ensure_ascii=False, indent=2)
@@ -0,0 +1,35 @@
+# scripts/build_preflop_table.py
+"""
+Precalcula l'equity preflop de les 169 mans canòniques contra cada rang de
+data/refs/preflop_ranges.json (compilat amb pesos, com en temps d'execució)
+i la desa a data/refs/preflop_equity.bin
+(rutes del repo; TIQQUN_RANGES i TIQQUN_PREFLOP_TABLE les canvien).
+Ús: python scripts/build_preflop_table.py [trials]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.equity import estimate_equity_batch
+from modules.preflop_table import HAND_CLASSES, default_table_path, representative, write_table
+from modules.ranges import PreflopRanges, default_ranges_path
+
+# Rutes del repo (o TIQQUN_RANGES / TIQQUN_PREFLOP_TABLE), no del directori actual
+SRC = default_ranges_path()
+DST = default_table_path()
+TRIALS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+ranges = PreflopRanges(str(SRC))
+keys = ranges.keys()
+rows = []
+t0 = time.time()
+for key in keys:
+    pos, act = key.split("/", 1)
+    villain = ranges.compiled_for(pos, act)
+    rows.append([estimate_equity_batch(representative(h), [], villain, trials=TRIALS) for h in HAND_CLASSES])
+    print(f"{key}: {len(villain)} combos{'' if villain.uniform else ' amb pesos'} ({time.time() - t0:.1f}s)")
+
+write_table(str(DST), keys, rows, ranges.weights_digest, TRIALS)
+print("WROTE", DST, "ranges:", len(keys), "hands:", len(HAND_CLASSES))
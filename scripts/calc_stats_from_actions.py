@@ -1,38 +1,57 @@
-﻿# scripts/calc_stats_from_actions.py
+# scripts/calc_stats_from_actions.py
+"""
+VPIP / PFR / 3-bet per jugador a partir dels JSONL d'ingesta.
+
+Incremental: els comptadors de cada fitxer d'entrada es guarden al manifest
+(data/processed/player_stats_manifest.json). Un fitxer sense canvis no es
+torna a llegir; d'un que ha crescut només es llegeixen els bytes nous; un
+fitxer canviat es recalcula sencer i un d'esborrat se'n treu.
+"""
 import json
+import sys
 from pathlib import Path
 
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.manifest import Manifest, primary_jsonl
+
 SRC = Path('data/interim/phh_parsed')
 OUT = Path('data/processed/player_stats.json')
+MANIFEST = OUT.parent / 'player_stats_manifest.json'
 
-files = sorted(SRC.glob('*.jsonl'))
+files = primary_jsonl(SRC)
 if not files:
     print('No .jsonl files found in', SRC)
     raise SystemExit(1)
 
-# accumuladors
-acc = {}   # name -> {'hands': int, 'vpip': int, 'pfr': int, 'threebet': int}
-
-def ensure(name):
+def ensure(acc, name):
     if name not in acc:
         acc[name] = {'hands': 0, 'vpip': 0, 'pfr': 0, 'threebet': 0}
 
-for f in files:
-    try:
-        s = f.read_text(encoding='utf-8', errors='replace').strip()
-        obj = json.loads(s)
-    except Exception as e:
-        print('SKIP', f.name, '(invalid json):', e)
-        continue
+def iter_hands(f, start=0):
+    """Una mà per línia (sortida de scripts/ingest_phh.py), llegida en streaming des del byte start."""
+    with open(f, 'rb') as fh:
+        fh.seek(start)
+        for no, raw in enumerate(fh, 1):
+            line = raw.decode('utf-8', errors='replace').lstrip('\ufeff').strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print('SKIP', f'{f.name}:{no}' if not start else f'{f.name}:+{no}', '(invalid json):', e)
 
+def add_hand(acc, obj):
+    """Suma una mà als comptadors acc (name -> hands/vpip/pfr/threebet)."""
     players = obj.get('players') or []
     actions = obj.get('actions') or []
     if not isinstance(players, list):
-        continue
+        return
 
     # preparar per mà
     for p in players:
-        ensure(p)
+        ensure(acc, p)
         acc[p]['hands'] += 1
 
     # definir map p1->player_name
@@ -112,17 +131,48 @@ for f in files:
         if threebet_flag.get(name):
             acc[name]['threebet'] += 1
 
+manifest = Manifest(MANIFEST)
+for key in list(manifest.missing()):
+    print('GONE', key)
+    manifest.forget(key)
+
+acc = {}   # name -> {'hands': int, 'vpip': int, 'pfr': int, 'threebet': int}, tots els fitxers
+hands = read = 0
+for f in files:
+    status = manifest.status(f)
+    entry = manifest.get(f)
+    size = f.stat().st_size
+    if status == 'same':
+        file_acc, file_hands = entry['stats'], entry['hands']
+    else:
+        # appended: comptadors guardats + només els bytes nous
+        start = entry['size'] if status == 'appended' else 0
+        file_acc = entry['stats'] if status == 'appended' else {}
+        file_hands = entry['hands'] if status == 'appended' else 0
+        for obj in iter_hands(f, start):
+            add_hand(file_acc, obj)
+            file_hands += 1
+        read += 1
+        manifest.record(f, size=size, append=(status == 'appended'), stats=file_acc, hands=file_hands)
+        print(status.upper(), f.name, 'hands:', file_hands)
+    hands += file_hands
+    for name, d in file_acc.items():
+        ensure(acc, name)
+        for k, v in d.items():
+            acc[name][k] += v
+manifest.save()
+
 # convertir a percentatges (enter, redondejat)
 out = {}
 for name, d in acc.items():
-    hands = d['hands'] or 1
+    n = d['hands'] or 1
     out[name] = {
         'hands': d['hands'],
-        'vpip': int(round(d['vpip'] / hands * 100)) ,
-        'pfr':  int(round(d['pfr']  / hands * 100)) ,
-        'threebet': int(round(d['threebet'] / hands * 100))
+        'vpip': int(round(d['vpip'] / n * 100)) ,
+        'pfr':  int(round(d['pfr']  / n * 100)) ,
+        'threebet': int(round(d['threebet'] / n * 100))
     }
 
 OUT.parent.mkdir(parents=True, exist_ok=True)
 OUT.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding='utf-8')
-print('WROTE', OUT, 'players:', list(out.keys()))
+print('WROTE', OUT, 'hands:', hands, 'players:', list(out.keys()), f'({read}/{len(files)} fitxers llegits)')
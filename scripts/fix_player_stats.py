@@ -1,11 +1,17 @@
 ﻿# scripts/fix_player_stats.py
 import json
+import sys
 from pathlib import Path
 
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.manifest import primary_jsonl
+
 SRC = Path('data/interim/phh_parsed')
 OUT = Path('data/processed/player_stats.json')
 
-files = sorted(SRC.glob('*.jsonl'))
+files = primary_jsonl(SRC)
 if not files:
     print('No .jsonl files found in', SRC)
     raise SystemExit(1)
@@ -0,0 +1,199 @@
+# scripts/ingest_phh.py
+"""
+Ingesta en streaming de PHH: llegeix .phh/.phhs (i .gz) línia a línia,
+tokenitza els camps 'clau = valor' a registres tipats (modules.phh) i escriu
+JSONL vàlid d'una sola passada, amb memòria d'una mà.
+Substitueix la cadena parse_phh_to_events → repair/normalize/force_clean.
+
+En paral·lel (--workers): cada fitxer, o cada tros de --chunk-mb d'un fitxer
+gran sense comprimir (tallat a l'inici d'una mà), és una feina d'un procés
+del pool. La sortida és determinista sigui quin sigui l'ordre d'acabament:
+<nom>.jsonl si el fitxer és d'un sol tros, o <nom>.part-NNNN.jsonl per tros
+(concatenats per nom, reprodueixen l'ordre del fitxer). <nom> surt de la
+ruta relativa al directori d'entrada ('s1/0.phh' → 's1__0'); si dues
+entrades donen el mateix nom (p. ex. x.phh i x.phh.gz) s'avorta abans
+d'escriure res. Es mostra el progrés per feina i el throughput per worker.
+
+Incremental: DST/_manifest.json guarda, per fitxer d'entrada, hash, mida,
+mtime i sortides. Un fitxer sense canvis se salta; un que només ha crescut
+(mans afegides al final) s'ingereix només des d'on es va quedar, en parts
+noves; qualsevol altre canvi el torna a ingerir sencer. --force ho ignora.
+
+Cada línia de sortida és una mà: els camps PHH tal qual (players, actions,
+starting_stacks, blinds_or_straddles, finishing_stacks, hand...) més
+source (ruta relativa del fitxer d'origen), index (ordre dins de la sortida) i, si el fitxer
+s'ha tallat, part.
+Ús: python scripts/ingest_phh.py [fitxers o directoris...] [--out DIR] [--workers N] [--chunk-mb MB] [--force]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.manifest import Manifest
+from modules.phh import chunk_ranges, is_phh, iter_hands, iter_range_lines, starts_hand
+
+SRC = REPO / "data" / "raw" / "phh"
+DST = REPO / "data" / "interim" / "phh_parsed"
+CHUNK_MB = 64
+MANIFEST = "_manifest.json"
+
+class Task(NamedTuple):
+    path: str
+    start: int
+    end: int
+    part: Optional[int]   # None: fitxer sencer en una sola sortida
+    out: str
+    source: str           # ruta relativa al directori d'entrada
+
+def out_stem(rel: str) -> str:
+    """Nom de sortida d'una ruta relativa: sense extensions PHH i amb '/' → '__'."""
+    name = rel
+    for suffix in (".gz", ".phhs", ".phh"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name.replace("/", "__")
+
+def plan_file(f: Path, rel: str, dst: Path, chunk_bytes: int, start: int = 0, first_part: int = 0,
+              size: Optional[int] = None) -> List[Task]:
+    """Feines d'un fitxer en ordre de tros, des del byte `start`; parts numerades des de first_part."""
+    stem = out_stem(rel)
+    ranges = chunk_ranges(f, chunk_bytes, start, size)
+    tasks = []
+    for k, (a, b) in enumerate(ranges, first_part):
+        part = None if first_part == 0 and len(ranges) == 1 else k
+        name = f"{stem}.jsonl" if part is None else f"{stem}.part-{k:04d}.jsonl"
+        tasks.append(Task(str(f), a, b, part, str(dst / name), rel))
+    return tasks
+
+def remove_outputs(rel: str, dst: Path) -> None:
+    stem = out_stem(rel)
+    for old in list(dst.glob(f"{stem}.part-*.jsonl")) + [dst / f"{stem}.jsonl"]:
+        if old.exists():
+            old.unlink()
+
+def ingest_task(task: Task) -> Dict:
+    """(Worker) Ingereix un tros i escriu la seva sortida via .tmp."""
+    t0 = time.perf_counter()
+    path = Path(task.path)
+    out = Path(task.out)
+    tmp = out.with_name(out.name + ".tmp")
+    errors = []
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as w:
+        for n, hand in enumerate(iter_hands(iter_range_lines(path, task.start, task.end), errors), 1):
+            hand["source"] = task.source
+            hand["index"] = n - 1
+            if task.part is not None:
+                hand["part"] = task.part
+            w.write(json.dumps(hand, ensure_ascii=False) + "\n")
+    os.replace(tmp, out)
+    return {"path": task.path, "out": out.name, "hands": n, "errors": errors[:5], "n_errors": len(errors),
+            "bytes": task.end - task.start, "secs": time.perf_counter() - t0, "pid": os.getpid()}
+
+def main():
+    ap = argparse.ArgumentParser(description="Ingesta PHH → JSONL tipat (streaming, paral·lel)")
+    ap.add_argument("paths", nargs="*", default=[str(SRC)], help=f"fitxers o directoris (per defecte {SRC})")
+    ap.add_argument("--out", default=str(DST), help="directori de sortida")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos (1 = seqüencial)")
+    ap.add_argument("--chunk-mb", type=float, default=CHUNK_MB, help="mida dels trossos de fitxers grans (0 = no tallar)")
+    ap.add_argument("--force", action="store_true", help="ignora el manifest i ho torna a ingerir tot")
+    args = ap.parse_args()
+
+    dst = Path(args.out)
+    dst.mkdir(parents=True, exist_ok=True)
+    files = []   # (fitxer, ruta relativa al directori d'entrada)
+    for p in map(Path, args.paths):
+        if p.is_dir():
+            files += [(f, f.relative_to(p).as_posix()) for f in sorted(p.rglob("*")) if f.is_file() and is_phh(f)]
+        else:
+            files.append((p, p.name))
+    if not files:
+        print("No PHH files found in", ", ".join(args.paths))
+        raise SystemExit(0)
+    seen = set()
+    files = [(f, rel) for f, rel in files if not (f.resolve() in seen or seen.add(f.resolve()))]
+    stems: Dict[str, Path] = {}
+    for f, rel in files:
+        other = stems.setdefault(out_stem(rel), f)
+        if other is not f:
+            print(f"ERROR: {other} i {f} escriurien la mateixa sortida '{out_stem(rel)}.jsonl'")
+            raise SystemExit(1)
+
+    manifest = Manifest(dst / MANIFEST)
+    chunk_bytes = int(args.chunk_mb * (1 << 20))
+    tasks: List[Task] = []
+    jobs: Dict[str, Dict] = {}   # fitxer -> mida planificada, sortides i mans anteriors
+    skipped = 0
+    for f, rel in files:
+        size = f.stat().st_size
+        status = "new" if args.force else manifest.status(f)
+        entry = manifest.get(f)
+        if status == "same" and all((dst / o).exists() for o in entry["outputs"]):
+            skipped += 1
+            continue
+        if (status == "appended" and f.suffix != ".gz" and starts_hand(f, entry["size"])
+                and all((dst / o).exists() for o in entry["outputs"])):
+            new = plan_file(f, rel, dst, chunk_bytes, entry["size"], len(entry["outputs"]), size)
+            jobs[str(f)] = {"size": size, "outputs": list(entry["outputs"]), "hands": entry.get("hands", 0),
+                           "append": True}
+            print(f"+ {rel}: {size - entry['size']} bytes nous")
+        else:
+            remove_outputs(rel, dst)
+            new = plan_file(f, rel, dst, chunk_bytes, 0, 0, size)
+            jobs[str(f)] = {"size": size, "outputs": [], "hands": 0, "append": False}
+        jobs[str(f)]["outputs"] += [Path(t.out).name for t in new]
+        tasks += new
+    if not tasks:
+        print(f"Res a fer: {skipped} fitxers sense canvis.")
+        return
+
+    t0 = time.perf_counter()
+    per_worker: Dict[int, Dict[str, float]] = {}
+    total = done = 0
+
+    def report(res: Dict) -> None:
+        nonlocal total, done
+        done += 1
+        total += res["hands"]
+        w = per_worker.setdefault(res["pid"], {"tasks": 0, "hands": 0, "bytes": 0, "secs": 0.0})
+        w["tasks"] += 1
+        w["hands"] += res["hands"]
+        w["bytes"] += res["bytes"]
+        w["secs"] += res["secs"]
+        jobs[res["path"]]["hands"] += res["hands"]
+        print(f"[{done}/{len(tasks)}] → {res['out']}: {res['hands']} mans, {res['n_errors']} errors "
+              f"({res['bytes'] / (1 << 20) / max(res['secs'], 1e-9):.1f} MB/s, pid {res['pid']})")
+        for no, msg in res["errors"]:
+            print(f"   línia {no} del tros: {msg}")
+
+    if args.workers <= 1:
+        for task in tasks:
+            report(ingest_task(task))
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(tasks))) as pool:
+            for fut in as_completed([pool.submit(ingest_task, t) for t in tasks]):
+                report(fut.result())
+
+    for f, job in jobs.items():
+        manifest.record(f, size=job["size"], outputs=job["outputs"], append=job["append"], hands=job["hands"])
+    manifest.save()
+
+    wall = max(time.perf_counter() - t0, 1e-9)
+    size = sum(t.end - t.start for t in tasks)
+    for pid, w in sorted(per_worker.items()):
+        busy = max(w["secs"], 1e-9)
+        print(f"  worker {pid}: {w['tasks']} feines, {w['hands']} mans, "
+              f"{w['hands'] / busy:.0f} mans/s, {w['bytes'] / (1 << 20) / busy:.1f} MB/s")
+    print(f"Done. {len(jobs)} fitxers ({skipped} sense canvis), {len(tasks)} feines, {total} mans en {wall:.1f}s "
+          f"({total / wall:.0f} mans/s, {size / (1 << 20) / wall:.1f} MB/s)")
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,16 @@ Per cada <name>.jsonl crea <name>.fixed.jsonl amb camps top-level
 players, actions, finishing_stacks, hand si s'han trobat dins
 de les strings d'events.
 """
-import json, re, ast
+import json, re, ast, sys
 from pathlib import Path
 
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.manifest import primary_jsonl
+
 SRC = Path('data/interim/phh_parsed')
-files = sorted([f for f in SRC.glob('*.jsonl') if not f.name.endswith('.fixed.jsonl')])
+files = primary_jsonl(SRC)
 if not files:
     print('No .jsonl files found in', SRC)
     raise SystemExit(0)
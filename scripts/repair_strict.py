@@ -1,7 +1,13 @@
 ﻿# repair_strict.py
 import json
+import sys
 from pathlib import Path
 
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.manifest import primary_jsonl
+
 def extract_first_json(s: str):
     start = None
     depth = 0
@@ -29,7 +35,7 @@ def extract_first_json(s: str):
     return None
 
 p = Path('data/interim/phh_parsed')
-files = sorted(p.glob('*.jsonl'))
+files = primary_jsonl(p)
 if not files:
     print('No .jsonl files found in', p)
     raise SystemExit(1)
@@ -1,9 +1,14 @@
 ﻿# scripts/robust_normalize.py
-import json, re, ast
+import json, re, ast, sys
 from pathlib import Path
 
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.manifest import primary_jsonl
+
 SRC = Path('data/interim/phh_parsed')
-files = sorted([f for f in SRC.glob('*.jsonl') if not f.name.endswith('.fixed2.jsonl')])
+files = primary_jsonl(SRC)
 if not files:
     print('No .jsonl files found in', SRC)
     raise SystemExit(0)
@@ -0,0 +1,33 @@
+# tests/test_equity_batch.py
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules.equity import estimate_equity, estimate_equity_adaptive, estimate_equity_batch, expand_range
+from modules.evaluator import hand_values_np, np
+
+VILLAIN = expand_range("TT+") + expand_range("AKs")
+
+@pytest.mark.parametrize("hero, board", [
+    (["As"], []),                 # heroi a mig escriure, preflop
+    ([], ["2c", "7d", "Jh"]),     # sense heroi al flop
+    (["As", "Kd"], ["2c", "7d", "Jh"]),
+])
+def test_batch_matches_scalar_engine(hero, board):
+    random.seed(7)
+    ref = estimate_equity(hero, board, VILLAIN, trials=40000)
+    assert estimate_equity_batch(hero, board, VILLAIN, trials=40000, seed=7) == pytest.approx(ref, abs=0.02)
+    assert estimate_equity_adaptive(hero, board, VILLAIN, target_se=0.002).equity == pytest.approx(ref, abs=0.02)
+
+@pytest.mark.skipif(np is None, reason="numpy no disponible")
+def test_hand_values_np_rejects_non_7_card_hands():
+    rng = random.Random(3)
+    hands = np.array([rng.sample(range(52), 7) for _ in range(1000)])
+    assert hand_values_np(hands).shape == (1000,)
+    with pytest.raises(ValueError):
+        hand_values_np(hands[:, :6])
@@ -0,0 +1,54 @@
+# tests/test_handlog.py
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+sys.path.insert(0, str(REPO / "ui"))
+
+import tiqqun_tk_clock as clock
+from modules.handlog import HandLog, iter_hands
+from modules.parser import STATE as PSTATE
+
+class _Value:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+class _Worker:
+    def cancel(self):
+        pass
+
+def test_end_and_log_writes_typed_decision_fields(tmp_path):
+    # Quads al flop amb SPR baix: RAISE amb sizing
+    req = {"hero_cards": ["As", "Ad"], "board": ["Ac", "Ah", "2c"], "street": "flop", "players": 2,
+           "pot": 40.0, "to_call": 5.0, "hero_seat": 4, "bb": 1.0, "stack": 100.0}
+    *_, (out, _settled) = clock.App._evaluate(req, lambda *_: None)
+
+    # App sense finestra: només el que end_and_log fa servir
+    app = clock.App.__new__(clock.App)
+    app._sync_state = lambda context="": req
+    app.worker = _Worker()
+    app._last_out = out
+    app.result_var = _Value("Win pot")
+    app.result_net = _Value("10")
+    app.handlog = HandLog(tmp_path, batch=100)
+    app.hand_id = 1
+    app.session = {"hands": 0, "wins": 0, "losses": 0, "splits": 0, "net": 0.0}
+    app._update_session_label = lambda: None
+    app.reset_all = lambda: None
+    PSTATE.update(pot=req["pot"], board=req["board"], hero_cards=req["hero_cards"], street="flop",
+                  to_call_hero=req["to_call"])
+
+    app.end_and_log()
+    app.handlog.close()
+
+    rows = list(iter_hands(tmp_path))
+    assert len(rows) == 1
+    row = rows[0]
+    assert row["decision"] == out.decision
+    assert row["spr"] is not None and row["spr"] == out.spr
+    assert row["sizing"] is not None and row["sizing"] == out.sizing
+    assert row["p_win"] == out.tech.p_win
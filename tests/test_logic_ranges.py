@@ -0,0 +1,38 @@
+# tests/test_logic_ranges.py
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from modules import logic
+from modules.equity import estimate_equity
+from modules.ranges import CompiledRange
+
+@pytest.fixture
+def asymmetric_ranges(tmp_path):
+    # Tres dels sis combos d'AA: sense AsXx, el rang no és simètric en pals
+    path = tmp_path / "preflop_ranges.json"
+    path.write_text(json.dumps({"CO": {"open": ["AhAd", "AhAc", "AdAc"]}}), encoding="utf-8")
+    logic.configure_data(str(path), str(tmp_path / "no_table.bin"))
+    yield logic.get_ranges().compiled_for("CO", "open")
+    logic.configure_data()
+
+def test_suit_symmetry_of_compiled_ranges():
+    assert CompiledRange.from_text("TT+, AKs, AQo:0.5").suit_symmetric
+    assert not CompiledRange.from_text("AhAd, AhAc, AdAc").suit_symmetric
+
+def test_asymmetric_range_is_not_canonicalized(asymmetric_ranges):
+    villain = asymmetric_ranges
+    assert not villain.suit_symmetric
+    # Mateixa forma canònica, equities diferents: la cache no les ha de barrejar
+    spots = [(["Ks", "Qs"], ["2s", "7s", "9c"]), (["Kh", "Qh"], ["2h", "7h", "9c"])]
+    truths = [estimate_equity(h, b, villain) for h, b in spots]
+    assert abs(truths[0] - truths[1]) > 0.01
+    for (hero, board), truth in zip(spots, truths):
+        assert logic.estimate_p_win(hero, board, 2) == pytest.approx(truth)
+        assert logic.estimate_p_win_adaptive(hero, board, 2).equity == pytest.approx(truth)
+        assert logic.estimate_p_win_anytime(hero, board, 2, deadline_ms=1000).equity == pytest.approx(truth)
@@ -0,0 +1,45 @@
+# tests/test_manifest.py
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+import modules.manifest as manifest_mod
+from modules.manifest import EDGE_BYTES, Manifest, file_hash, primary_jsonl
+
+def test_append_only_hashes_the_tail(tmp_path, monkeypatch):
+    f = tmp_path / "a.jsonl"
+    f.write_bytes(b'{"hand": 1}\n' * 50000)
+    (tmp_path / "a.fixed.jsonl").write_text("{}\n")
+    assert primary_jsonl(tmp_path) == [f]
+
+    m = Manifest(tmp_path / "manifest.json")
+    m.record(f)
+    m.save()
+    old = f.stat().st_size
+    with open(f, "ab") as fh:
+        fh.write(b'{"hand": 2}\n' * 10)
+
+    hashed = []
+    def counting(path, limit=None, block=1 << 20, start=0):
+        hashed.append((limit if limit is not None else Path(path).stat().st_size) - start)
+        return file_hash(path, limit, block, start)
+    monkeypatch.setattr(manifest_mod, "file_hash", counting)
+
+    m = Manifest(tmp_path / "manifest.json")
+    assert m.status(f) == "appended"
+    entry = m.record(f, append=True)
+    assert sum(hashed) <= 2 * EDGE_BYTES + (f.stat().st_size - old) < old
+    # El prefix conserva el seu segment; la cua n'és un de nou
+    assert [end for end, _ in entry["segments"]] == [old, f.stat().st_size]
+    m.save()
+    assert Manifest(tmp_path / "manifest.json").status(f) == "same"
+
+def test_rewrite_before_old_end_is_changed(tmp_path):
+    f = tmp_path / "a.jsonl"
+    f.write_bytes(b"x" * 1000)
+    m = Manifest(tmp_path / "manifest.json")
+    m.record(f)
+    f.write_bytes(b"x" * 990 + b"y" * 10 + b"z" * 100)
+    assert m.status(f) == "changed"
@@ -1,7 +1,15 @@
 
+import argparse
+import json
+import sys
+import time
+from collections import deque
+
 from modules.parser import parse_line
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        return replay(sys.argv[2:])
     print("TIQQUN CLI v0 — escriu comandes (NEW/SEATS/BTN/SB/BB/A/F/T/R/END). CTRL+C per sortir.")
     while True:
         try:
@@ -18,5 +26,81 @@ def main():
         if out:
             print(out)
 
+def replay(argv):
+    """
+    tiqqun_cli.py replay FITXERS... [--out recs.jsonl] [--workers N] [--hero pN|nom]
+                                    [--budget-ms MS]
+    Reprodueix fitxers de comandes i mans PHH (.phh/.phhs/.jsonl) en processos
+    worker; escriu un registre JSONL per recomanació i mostra mans/s i
+    percentils de latència per carrer.
+    """
+    from modules.latency import LatencyStats
+    from modules.parallel import default_workers, get_pool, shutdown_pool
+    from modules.replay import iter_jobs, run_job
+
+    ap = argparse.ArgumentParser(prog="tiqqun_cli.py replay", description="Replay massiu pel motor")
+    ap.add_argument("paths", nargs="+", help="fitxers o directoris")
+    ap.add_argument("--out", default="-", help="JSONL de sortida (per defecte stdout)")
+    ap.add_argument("--workers", type=int, default=None, help="processos (1 = sense pool)")
+    ap.add_argument("--hero", default=None, help="PHH: seient 'pN' o nom (per defecte tots els coneguts)")
+    ap.add_argument("--budget-ms", type=float, default=None, help="pressupost de latència per recomanació")
+    args = ap.parse_args(argv)
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    stats = LatencyStats()
+    hands = seats = recs = errors = 0
+    last_hand = None
+    t0 = time.perf_counter()
+
+    def emit(job, records):
+        # una feina per seient d'heroi; les d'una mateixa mà surten seguides (ordre d'entrada)
+        nonlocal hands, seats, recs, errors, last_hand
+        seats += 1
+        if (job.source, job.hand) != last_hand:
+            hands += 1
+            last_hand = (job.source, job.hand)
+        for r in records:
+            if "error" in r:
+                errors += 1
+            else:
+                recs += 1
+                stats.add(r["latency_ms"], r["street"])
+            out.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    jobs = iter_jobs(args.paths, args.hero)
+    if args.workers == 1:
+        if args.budget_ms is not None:
+            from modules.evaluator import warm_up
+            warm_up()  # els workers del pool ja ho fan en arrencar
+        for job in jobs:
+            emit(job, run_job(job, args.budget_ms))
+    else:
+        # finestra acotada de feines en curs; sortida en l'ordre d'entrada
+        pool = get_pool(args.workers)
+        window = 4 * (args.workers or default_workers())
+        pending = deque()
+        try:
+            for job in jobs:
+                pending.append((job, pool.submit(run_job, job, args.budget_ms)))
+                if len(pending) >= window:
+                    job, fut = pending.popleft()
+                    emit(job, fut.result())
+            while pending:
+                job, fut = pending.popleft()
+                emit(job, fut.result())
+        finally:
+            shutdown_pool()
+
+    wall = time.perf_counter() - t0
+    if out is not sys.stdout:
+        out.close()
+    log = sys.stderr
+    print(f"REPLAY mans={hands} seients={seats} recomanacions={recs} errors={errors} en {wall:.2f}s "
+          f"({hands / max(wall, 1e-9):.1f} mans/s, {recs / max(wall, 1e-9):.1f} recom/s)", file=log)
+    print(f"  total: {stats.format()}", file=log)
+    for street in ("preflop", "flop", "turn", "river"):
+        if stats.summary(street)["n"]:
+            print(f"  {street}: {stats.format(street)}", file=log)
+
 if __name__ == "__main__":
     main()
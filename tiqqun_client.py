@@ -0,0 +1,72 @@
+"""
+Client local del servidor TIQQUN: fa de "tracker de taula" enviant fitxers
+de comandes (o stdin) i imprimint les respostes.
+
+Amb --tables N obre N connexions simultànies que reprodueixen els mateixos
+fitxers, per provar que les taules no es bloquegen entre elles. Al final
+mostra la latència d'anada i tornada mesurada pel client i el STATS del
+servidor per a cada connexió.
+Ús: python tiqqun_client.py [fitxers...] [--port 7777] [--unix PATH] [--tables N] [-q]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import List, Optional
+
+from modules.latency import LatencyStats
+
+async def run_table(idx: int, lines: List[str], args, stats: LatencyStats) -> str:
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    for line in lines:
+        t0 = time.perf_counter()
+        writer.write((line + "\n").encode("utf-8"))
+        await writer.drain()
+        reply = (await reader.readline()).decode("utf-8", "replace").rstrip("\n")
+        stats.add(1000.0 * (time.perf_counter() - t0), "recom" if reply.startswith("RECOM") else None)
+        if not args.quiet:
+            print(f"[t{idx}] {line}\n[t{idx}] → {reply}")
+    writer.write(b"STATS\n")
+    await writer.drain()
+    server_stats = (await reader.readline()).decode("utf-8", "replace").strip()
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+    return server_stats
+
+def _read_lines(paths: List[str]) -> List[str]:
+    if not paths:
+        return [ln.strip() for ln in sys.stdin if ln.strip()]
+    out: List[str] = []
+    for p in paths:
+        with open(p, "r", encoding="utf-8-sig") as fh:
+            out += [ln.strip() for ln in fh if ln.strip() and not ln.lstrip().startswith("#")]
+    return out
+
+async def main_async(args) -> None:
+    lines = _read_lines(args.files)
+    stats = LatencyStats()
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(run_table(i, lines, args, stats) for i in range(args.tables)))
+    wall = time.perf_counter() - t0
+    for i, r in enumerate(results):
+        print(f"[t{i}] servidor: {r}")
+    print(f"client: {args.tables} taules, {len(lines)} línies/taula en {wall:.2f}s")
+    print(f"client RTT totes: {stats.format()}")
+    print(f"client RTT RECOM: {stats.format('recom')}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Client de prova del servidor TIQQUN")
+    ap.add_argument("files", nargs="*", help="fitxers de comandes (per defecte stdin)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7777)
+    ap.add_argument("--unix", help="ruta de socket Unix")
+    ap.add_argument("--tables", type=int, default=1, help="connexions simultànies")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no imprimeix cada resposta")
+    asyncio.run(main_async(ap.parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
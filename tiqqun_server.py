@@ -0,0 +1,114 @@
+"""
+Servidor asyncio del protocol de línies de TIQQUN (NEW/SEATS/A/F/T/R/END).
+
+Cada connexió (TCP o socket Unix) és una taula amb la seva TableSession.
+L'estat s'actualitza al bucle d'esdeveniments i l'avaluació d'equity va al
+pool de processos persistent (modules.parallel), de manera que un river lent
+en una taula no atura les altres. L'equity tornada pel worker queda a la
+sessió, i les accions que només mouen el pot no tornen a simular. Dins
+d'una connexió les respostes surten en ordre: una línia de resposta per
+línia rebuda.
+
+Comandes extra: STATS (latències de la connexió per carrer) i QUIT.
+Amb --budget-ms, cada recomanació surt dins d'aquest pressupost (equity
+anytime) i les següents del mateix spot continuen refinant-la.
+Ús: python tiqqun_server.py [--host 127.0.0.1] [--port 7777] [--unix PATH] [--workers N]
+                           [--budget-ms MS]
+"""
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+from modules.evaluator import warm_up
+from modules.latency import LatencyStats
+from modules.parallel import default_workers, get_pool, shutdown_pool
+from modules.parser import TableSession, decide, format_recommendation
+
+STATS_WINDOW = 10000   # mostres per sèrie per als percentils (memòria fitada)
+SERVER_STATS = LatencyStats(window=STATS_WINDOW)
+
+def _stats_line(stats: LatencyStats, lines: int) -> str:
+    parts = [f"STATS lines={lines} evals {stats.format()}"]
+    for street in ("preflop", "flop", "turn", "river"):
+        if stats.summary(street)["n"]:
+            parts.append(f"{street}: {stats.format(street)}")
+    return " | ".join(parts)
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, workers: Optional[int],
+                 budget_ms: Optional[float] = None) -> None:
+    loop = asyncio.get_running_loop()
+    pool = get_pool(workers)
+    peer = writer.get_extra_info("peername") or "unix"
+    session = TableSession(table_id=str(peer), deadline_ms=budget_ms)
+    stats = LatencyStats(window=STATS_WINDOW)
+    lines = 0
+    print(f"[{peer}] connectat")
+    try:
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            line = raw.decode("utf-8", "replace").strip()
+            cmd = line.upper()
+            if cmd == "QUIT":
+                break
+            if cmd == "STATS":
+                reply = _stats_line(stats, lines)
+            else:
+                lines += 1
+                t0 = time.perf_counter()
+                try:
+                    reply, spot = session.step(line)
+                    if spot is not None:
+                        out, spr = await loop.run_in_executor(pool, decide, spot)
+                        session.remember(spot, out.tech)
+                        reply = format_recommendation(out, spr)
+                        ms = 1000.0 * (time.perf_counter() - t0)
+                        stats.add(ms, spot.street)
+                        SERVER_STATS.add(ms, spot.street)
+                except Exception as e:
+                    reply = f"ERR: {type(e).__name__}: {e}"
+            writer.write(((reply or "OK") + "\n").encode("utf-8"))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        print(f"[{peer}] tancat: {_stats_line(stats, lines)}")
+        writer.close()
+
+async def serve(host: str, port: int, unix: Optional[str], workers: Optional[int],
+                budget_ms: Optional[float] = None) -> None:
+    def client(r, w):
+        return handle(r, w, workers, budget_ms)
+
+    # arrenca i escalfa els workers abans d'acceptar taules (res de cost inicial dins del pressupost)
+    loop = asyncio.get_running_loop()
+    pool = get_pool(workers)
+    await asyncio.gather(*(loop.run_in_executor(pool, warm_up) for _ in range(workers or default_workers())))
+    if unix:
+        server = await asyncio.start_unix_server(client, path=unix)
+    else:
+        server = await asyncio.start_server(client, host, port)
+    where = unix or f"{host}:{port}"
+    print(f"TIQQUN server escoltant a {where} (workers={workers or 'auto'}, budget={budget_ms or '-'}ms)")
+    async with server:
+        await server.serve_forever()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Servidor TIQQUN (protocol de línies)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7777)
+    ap.add_argument("--unix", help="ruta de socket Unix (en lloc de TCP)")
+    ap.add_argument("--workers", type=int, default=None, help="processos d'avaluació (per defecte CPUs-1)")
+    ap.add_argument("--budget-ms", type=float, default=None, help="pressupost de latència per recomanació")
+    args = ap.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.budget_ms))
+    except KeyboardInterrupt:
+        print(f"\nAdeu! global: {SERVER_STATS.format()}")
+    finally:
+        shutdown_pool()
+
+if __name__ == "__main__":
+    main()
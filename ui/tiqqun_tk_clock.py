@@ -1,20 +1,30 @@
 ﻿# -*- coding: utf-8 -*-
 # TIQQUN TK Clock — amb Projectes, Logs, Reset/End i Panell de Rivals (heurístic)
-from typing import Dict, List
-import os, csv, datetime as dt
+from typing import Callable, Dict, Iterator, List
+import os
+import queue, threading
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox as mb
 
 # Core TIQQUN
-from modules.parser import STATE as PSTATE
-from modules.logic import tech_eval
+from modules.parser import STATE as PSTATE, spot_spr
+from modules.logic import is_settled, tech_eval
 from modules.simbolic import flow_score
-from modules.motor import fuse_scores
+from modules.motor import decide_action
+from modules.draws import analyze_draws
+from modules.evaluator import CARD_INDEX, warm_up
+from modules.handlog import HandLog
 
 POS_OPTS = ("None","SB","BB","BTN")
 ACT_OPTS = ("", "bet", "call", "raise", "fold", "allin")
 
+# Equity anytime: primera resposta en LIVE_BUDGET_MS i refinament en trams
+# iguals fins que l'estimació és prou bona (tot al fil d'EvalWorker)
+LIVE_BUDGET_MS = 50
+DEBOUNCE_MS    = 150   # ràfegues d'edicions: només s'avalua l'última
+POLL_MS        = 40    # cada quant el fil de Tk recull resultats
+
 FONT       = ("Segoe UI", 10)
 FONT_SMALL = ("Segoe UI", 9)
 FONT_MONO  = ("Consolas", 11)
@@ -152,6 +162,76 @@ class BoardFrame(ttk.LabelFrame):
         app: "App" = self.master.master
         app.recompute(context="BOARD")
 
+class _Superseded(Exception):
+    """Una petició més nova ha deixat aquesta feina obsoleta."""
+
+class EvalWorker:
+    """
+    Avaluació en un fil de fons perquè la UI no es congeli. submit() fa
+    debounce (d'una ràfega d'edicions només s'avalua l'última), cada petició
+    nova cancel·la l'anterior, també a mitja simulació, i els resultats
+    tornen al fil de Tk per una cua que es buida amb after(). Tk només es toca
+    des del fil principal.
+
+    evaluate(req, check) és un generador que dóna resultats cada cop més
+    refinats; ha de cridar check() sovint (llança _Superseded si cal parar).
+    """
+
+    def __init__(self, root: tk.Misc, evaluate: Callable[[Dict, Callable], Iterator],
+                 on_result: Callable[[Dict, object], None]):
+        self.root = root
+        self.evaluate = evaluate
+        self.on_result = on_result
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._results: "queue.Queue" = queue.Queue()
+        self._gen = 0            # generació vigent; les feines d'altres generacions es descarten
+        self._debounce = None
+        threading.Thread(target=self._run, name="tiqqun-eval", daemon=True).start()
+        self.root.after(POLL_MS, self._poll)
+
+    def submit(self, req: Dict) -> None:
+        self.cancel()
+        gen = self._gen
+        self._debounce = self.root.after(DEBOUNCE_MS, lambda: self._jobs.put((gen, req)))
+
+    def cancel(self) -> None:
+        self._gen += 1
+        if self._debounce is not None:
+            self.root.after_cancel(self._debounce)
+            self._debounce = None
+
+    def _run(self) -> None:
+        while True:
+            gen, req = self._jobs.get()
+
+            def check(*_):
+                if gen != self._gen:
+                    raise _Superseded
+
+            try:
+                check()
+                for res in self.evaluate(req, check):
+                    self._results.put((gen, req, res))
+                    check()
+            except _Superseded:
+                continue
+            except Exception as e:  # l'error es mostra a la UI, el fil continua
+                self._results.put((gen, req, e))
+
+    def _poll(self) -> None:
+        """Buida la cua i pinta només l'últim resultat de la generació vigent."""
+        latest = None
+        try:
+            while True:
+                gen, req, res = self._results.get_nowait()
+                if gen == self._gen:   # resultats obsolets: es queda el que ja es veu
+                    latest = (req, res)
+        except queue.Empty:
+            pass
+        if latest is not None:
+            self.on_result(*latest)
+        self.root.after(POLL_MS, self._poll)
+
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -173,9 +253,13 @@ class App(tk.Tk):
         base = os.path.dirname(os.path.abspath(__file__))
         self.log_dir = os.path.normpath(os.path.join(base, "..", "logs"))
         os.makedirs(self.log_dir, exist_ok=True)
-        self.log_path = os.path.join(self.log_dir, "hands_log.csv")
+        self.handlog = HandLog(self.log_dir)   # logs/hands_YYYYMM.sqlite, escriptura per lots
+        self._last_out = None                   # última recomanació mostrada (per al registre)
         self.session = {"hands": 0, "wins": 0, "losses": 0, "splits": 0, "net": 0.0}
         self.hand_id = 1
+        warm_up()  # taules numpy abans del primer recompute (pressupost LIVE_BUDGET_MS)
+        self.worker = EvalWorker(self, self._evaluate, self._show_result)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         main = ttk.Frame(self); main.pack(fill="both", expand=True)
 
@@ -232,7 +316,14 @@ class App(tk.Tk):
         self.bind("<F5>", lambda e: self.reset_all())
         self.bind("<F9>", lambda e: self.end_and_log())
 
+    def _on_close(self):
+        self.worker.cancel()
+        self.handlog.close()
+        self.destroy()
+
     def reset_all(self):
+        self.worker.cancel()
+        self._last_out = None
         frames = (self.p1, self.p2, self.p3, self.p4, self.p5, self.p6, self.p7, self.p8)
         for pf in frames:
             pf.pos.set("None")
@@ -253,6 +344,20 @@ class App(tk.Tk):
         self.result_var.set("Win pot"); self.result_net.delete(0,"end"); self.result_net.insert(0,"0")
 
     def recompute(self, context: str = ""):
+        req = self._sync_state(context)
+        self.worker.submit(req)
+
+        P1, P2, P3, P4, P5, P6, P7, P8 = req["players_read"]
+        board, hero_cards, pot, mx = req["board"], req["hero_cards"], req["pot"], req["max_bet"]
+
+        # Projectes al centre
+        self.update_projects_label(hero_cards, board)
+        # Rivals actius (heurística simple)
+        others = [("P1",P1),("P2",P2),("P3",P3),("P5",P5),("P6",P6),("P7",P7),("P8",P8)]
+        self.update_rivals_panel(others, board, pot, PSTATE["street"], mx)
+
+    def _sync_state(self, context: str) -> Dict:
+        """Llegeix la taula, actualitza PSTATE i retorna la petició d'avaluació."""
         P1 = self.p1.read(); P2 = self.p2.read(); P3 = self.p3.read(); P4 = self.pH.read()
         P5 = self.p5.read(); P6 = self.p6.read(); P7 = self.p7.read(); P8 = self.p8.read()
         all_players = [P1, P2, P3, P4, P5, P6, P7, P8]
@@ -278,20 +383,43 @@ class App(tk.Tk):
         PSTATE["pot"] = pot
         PSTATE["to_call_hero"] = to_call
         PSTATE["hero_seat"] = 4
-
-        tech = tech_eval(PSTATE["hero_cards"], PSTATE["board"], n_players, PSTATE["pot"], PSTATE["to_call_hero"], PSTATE["hero_seat"])
-        flow = flow_score(PSTATE["hero_cards"], PSTATE["street"], PSTATE["board"])
-        out = fuse_scores(tech, flow)
-
-        self.out.config(text=f"[{context}] RECOM {out.decision} | conf={out.conf_final:.2f} | "
-                             f"p_win={out.tech.p_win:.2f} | ev={out.tech.ev_hint:.2f} | "
-                             f"flow={out.flow:.2f} | pot={pot:.2f} | to_call={to_call:.2f}")
-
-        # Projectes al centre
-        self.update_projects_label(hero_cards, board)
-        # Rivals actius (heurística simple)
-        others = [("P1",P1),("P2",P2),("P3",P3),("P5",P5),("P6",P6),("P7",P7),("P8",P8)]
-        self.update_rivals_panel(others, board, pot, PSTATE["street"], mx)
+        return {"context": context, "players_read": all_players, "hero_cards": list(hero_cards),
+                "board": list(board), "street": PSTATE["street"], "players": n_players,
+                "pot": pot, "to_call": to_call, "max_bet": mx, "hero_seat": 4,
+                "bb": PSTATE["bb"], "stack": float(PSTATE.get("stack_effective", 100.0))}
+
+    @staticmethod
+    def _evaluate(req: Dict, check: Callable) -> Iterator:
+        """
+        (Fil de fons) Trams de LIVE_BUDGET_MS fins que p_win està prou refinada,
+        o fins que un tram ja no hi afegeix trials (l'estimador ha arribat al
+        seu límit).
+        """
+        flow = flow_score(req["hero_cards"], req["street"], req["board"])
+        spr = spot_spr(req["pot"], req["bb"], req["stack"])   # com parser.decide
+        tech = None
+        while True:
+            trials = tech.trials if tech is not None else None
+            tech = tech_eval(req["hero_cards"], req["board"], req["players"], req["pot"], req["to_call"],
+                             req["hero_seat"], adaptive=True, deadline_ms=LIVE_BUDGET_MS, on_update=check)
+            settled = (is_settled(tech, req["pot"], req["to_call"], players=req["players"])
+                       or (trials is not None and (tech.trials or 0) <= trials))
+            yield decide_action(tech, flow, req["pot"], req["to_call"], spr), settled
+            if settled:
+                return
+
+    def _show_result(self, req: Dict, res) -> None:
+        """(Fil de Tk) Pinta el resultat més recent; fins llavors es veu l'anterior."""
+        if isinstance(res, Exception):
+            self.out.config(text=f"[{req['context']}] ERR {type(res).__name__}: {res}")
+            return
+        out, settled = res
+        self._last_out = out
+        sizing = f" {out.sizing:.0f}%pot" if out.sizing is not None else ""
+        self.out.config(text=f"[{req['context']}] RECOM {out.decision}{sizing} | conf={out.conf_final:.2f} | "
+                             f"p_win={out.tech.p_win:.2f} | ev={out.tech.ev_hint:.2f} | SPR={out.spr:.2f} | "
+                             f"flow={out.flow:.2f} | pot={req['pot']:.2f} | to_call={req['to_call']:.2f}"
+                             + ("" if settled else f" | refinant ({out.tech.trials} trials)"))
 
     # ===== Helpers de projectes =====
     def _rank_val(self, c: str) -> int:
@@ -303,35 +431,24 @@ class App(tk.Tk):
     def _suit(self, c: str) -> str:
         return c[-1:].upper() if c else ""
 
-    def update_projects_label(self, hero: List[str], board: List[str]) -> None:
-        cards = [x for x in hero + board if x]
-        txt = []
-        suits = {}
-        for c in cards: suits[self._suit(c)] = suits.get(self._suit(c), 0) + 1
-        maxs = max(suits.values()) if suits else 0
-        if maxs >= 5: txt.append("Color fet")
-        elif maxs == 4: txt.append("Flush draw")
-
-        vals = sorted(set(self._rank_val(c) for c in cards))
-        if 14 in vals: vals = sorted(set(vals + [1]))  # roda A-5
-        found_oesd = False; found_gut = False
-        for i in range(len(vals)):
-            win = [v for v in vals if vals[i] <= v <= vals[i] + 4]
-            if len(win) >= 5: 
-                found_oesd = True; break
-            if len(win) == 4:
-                if win[-1] - win[0] == 3: found_oesd = True
-                elif win[-1] - win[0] == 4: found_gut = True
-        if found_oesd: txt.append("OESD")
-        elif found_gut: txt.append("Gutshot")
-
-        bvals = [self._rank_val(c) for c in board]
-        if bvals:
-            topb = max(bvals)
-            hvals = [self._rank_val(c) for c in hero]
-            if all(h > topb for h in hvals if h):
-                txt.append("Overcards")
+    def _card(self, c: str):
+        """Carta de l'Entry en forma canònica ('ah', '10h' → 'Ah', 'Th'), o None si no és vàlida."""
+        r = c.strip()[:-1].upper().replace("10", "T")
+        card = r + c.strip()[-1:].lower()
+        return card if card in CARD_INDEX else None
 
+    def update_projects_label(self, hero: List[str], board: List[str]) -> None:
+        # Mateixa anàlisi (memoritzada) que tech_eval fa servir per a p_improve.
+        # Mentre s'escriu hi pot haver cartes a mitges o repetides: etiqueta buida.
+        cards = [self._card(c) for c in hero + board]
+        if None in cards or len(set(cards)) < len(cards):
+            self.center_info.config(text="Projectes —")
+            return
+        d = analyze_draws(cards[:len(hero)], cards[len(hero):])
+        txt = list(d.labels)
+        if d.outs:
+            per_cat = ", ".join(f"{k} {n}" for k, n in d.outs_by_category)
+            txt.append(f"outs={d.outs} ({per_cat}) | 1c={d.p_next:.0%} river={d.p_river:.0%}")
         self.center_info.config(text="Projectes — " + (", ".join(txt) if txt else "—"))
 
     # ===== Panell Rivals: textura + inferència simple =====
@@ -426,12 +543,13 @@ class App(tk.Tk):
         self.session_lbl.config(text=f"Sessió — mans:{s['hands']} | wins:{s['wins']} | losses:{s['losses']} | net:{s['net']:.2f}")
 
     def end_and_log(self):
-        # actualitza estat
-        self.recompute(context="END")
+        # actualitza estat (sense esperar cap avaluació: es registra l'última recomanació vista)
+        self._sync_state(context="END")
+        self.worker.cancel()
         pot   = float(PSTATE.get("pot", 0.0))
-        board = " ".join(PSTATE.get("board", [])) or "-"
-        hero  = " ".join(PSTATE.get("hero_cards", [])) or "-"
-        recom = self.out.cget("text")
+        board = " ".join(PSTATE.get("board", []))
+        hero  = " ".join(PSTATE.get("hero_cards", []))
+        out   = self._last_out
         outcome = self.result_var.get()
         net = 0.0
         try: net = ffloat(self.result_net.get())
@@ -439,12 +557,13 @@ class App(tk.Tk):
         if outcome == "Win pot" and net == 0.0: net = pot
         if outcome == "Lose" and net > 0:      net = -abs(net)
 
-        newfile = not os.path.exists(self.log_path)
-        with open(self.log_path, "a", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            if newfile: w.writerow(["ts","hand_id","outcome","net","pot","hero","board","recom"])
-            w.writerow([dt.datetime.now().isoformat(timespec="seconds"),
-                        self.hand_id, outcome, f"{net:.2f}", f"{pot:.2f}", hero, board, recom])
+        self.handlog.log(
+            hand_id=self.hand_id, outcome=outcome, net=round(net, 2), pot=round(pot, 2),
+            to_call=float(PSTATE.get("to_call_hero", 0.0)), hero=hero, board=board, street=PSTATE.get("street"),
+            decision=out.decision if out else None, conf=out.conf_final if out else None,
+            p_win=out.tech.p_win if out else None, spr=out.spr if out else None,
+            sizing=out.sizing if out else None, trials=out.tech.trials if out else None,
+        )
 
         self.session["hands"] += 1
         if outcome == "Win pot" and net > 0: self.session["wins"] += 1